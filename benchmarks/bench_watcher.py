@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Benchmark the auto-commit watcher against synthetic repositories
+Generates local git repositories of configurable size (via git fast-import), pushes to
+a local bare remote, answers commit-message requests from a local fake LLM endpoint,
+and reports per-phase latency percentiles and peak RSS as JSON
+
+Example:
+    python benchmarks/bench_watcher.py --sizes 1000 10000 100000 --output bench.json
+    python benchmarks/bench_watcher.py --sizes 1000 --compare bench.json
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATTERNS = ["edit", "add", "delete", "rename", "binary"]
+FILES_PER_DIRECTORY = 100
+BENCH_IDENTITY = {
+    "GIT_AUTHOR_NAME": "Bench",
+    "GIT_AUTHOR_EMAIL": "bench@example.com",
+    "GIT_COMMITTER_NAME": "Bench",
+    "GIT_COMMITTER_EMAIL": "bench@example.com",
+}
+
+
+def percentiles(samples):
+    """Nearest-rank summary of a list of durations (or sizes)"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def rank(fraction):
+        return ordered[min(len(ordered), max(1, math.ceil(fraction * len(ordered)))) - 1]
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": rank(0.50),
+        "p90": rank(0.90),
+        "p99": rank(0.99),
+        "max": ordered[-1],
+    }
+
+
+def git(repo, *args, input=None):
+    """Run a git command in repo and fail loudly; benchmarks should not hide setup errors"""
+    return subprocess.run(["git", *args], cwd=repo, input=input, capture_output=True, check=True).stdout
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible /chat/completions endpoint with a fixed answer and optional latency"""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = "".join(message.get("content", "") for message in request.get("messages", []))
+        body = json.dumps({
+            "choices": [{"message": {"content": "chore: benchmark change"}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 5},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_fake_llm(latency_ms=0):
+    """Serve the fake endpoint on an ephemeral port; returns (server, base_url)"""
+    handler = type("Handler", (FakeLLMHandler,), {"latency": latency_ms / 1000})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class SyntheticRepo:
+    """A generated working repository, its bare remote, and the list of files it tracks"""
+
+    def __init__(self, root, file_count, history=1, binary_files=0, binary_kb=64, seed=0):
+        self.root = root
+        self.path = os.path.join(root, "work")
+        self.remote = os.path.join(root, "remote.git")
+        self.rng = random.Random(seed)
+        self.file_count = file_count
+        self.history = max(1, history)
+        self.binary_kb = binary_kb
+        self.text_files = [self._path_for(i) for i in range(file_count)]
+        self.binary_files = [f"assets/blob_{i:04d}.bin" for i in range(binary_files)]
+        self.next_new = file_count
+
+    def _path_for(self, index):
+        directory = index // FILES_PER_DIRECTORY
+        return f"src/d{directory // 100:03d}/d{directory % 100:02d}/module_{index:06d}.py"
+
+    def _text(self, index, revision=0):
+        lines = [f"# module {index} revision {revision}"]
+        for j in range(self.rng.randint(5, 30)):
+            lines.append(f"def func_{index}_{j}(value):\n    return value * {j + revision}\n")
+        return "\n".join(lines).encode()
+
+    def _binary(self):
+        return self.rng.randbytes(self.binary_kb * 1024)
+
+    def create(self):
+        """Build the history with one git fast-import stream, check it out and push it"""
+        os.makedirs(self.path)
+        git(self.root, "init", "-q", "--bare", self.remote)
+        git(self.path, "init", "-q")
+        git(self.path, "symbolic-ref", "HEAD", "refs/heads/main")
+
+        # Streamed straight into fast-import so generating the repo does not inflate peak RSS
+        importer = subprocess.Popen(["git", "fast-import", "--quiet"], cwd=self.path, stdin=subprocess.PIPE)
+        stream = importer.stdin
+        timestamp = 1700000000
+
+        def commit(message, modifications):
+            nonlocal timestamp
+            timestamp += 60
+            stream.write(b"commit refs/heads/main\n")
+            stream.write(f"committer Bench <bench@example.com> {timestamp} +0000\n".encode())
+            stream.write(f"data {len(message)}\n{message}\n".encode())
+            for path, content in modifications:
+                stream.write(f"M 100644 inline {path}\ndata {len(content)}\n".encode())
+                stream.write(content)
+                stream.write(b"\n")
+
+        initial = ((path, self._text(i)) for i, path in enumerate(self.text_files))
+        commit("initial import", initial)
+        if self.binary_files:
+            commit("add binary assets", ((path, self._binary()) for path in self.binary_files))
+        for revision in range(1, self.history):
+            touched = self.rng.sample(range(len(self.text_files)), min(10, len(self.text_files)))
+            commit(f"revision {revision}", [(self.text_files[i], self._text(i, revision)) for i in touched])
+
+        stream.close()
+        if importer.wait() != 0:
+            raise RuntimeError("git fast-import failed")
+        git(self.path, "reset", "-q", "--hard")
+        git(self.path, "remote", "add", "origin", self.remote)
+        git(self.path, "push", "-q", "-u", "origin", "main")
+
+    def apply(self, pattern, count):
+        """Change count files in the working tree following pattern"""
+        for _ in range(count):
+            if pattern == "edit" and self.text_files:
+                path = self.rng.choice(self.text_files)
+                with open(os.path.join(self.path, path), "a") as f:
+                    f.write(f"\ndef edited_{self.rng.randrange(10 ** 9)}():\n    return None\n")
+            elif pattern == "add":
+                path = self._path_for(self.next_new)
+                self.next_new += 1
+                full_path = os.path.join(self.path, path)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                with open(full_path, "wb") as f:
+                    f.write(self._text(self.next_new))
+                self.text_files.append(path)
+            elif pattern == "delete" and len(self.text_files) > 1:
+                path = self.text_files.pop(self.rng.randrange(len(self.text_files)))
+                os.remove(os.path.join(self.path, path))
+            elif pattern == "rename" and self.text_files:
+                index = self.rng.randrange(len(self.text_files))
+                new_path = self._path_for(self.next_new)
+                self.next_new += 1
+                full_path = os.path.join(self.path, new_path)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.rename(os.path.join(self.path, self.text_files[index]), full_path)
+                self.text_files[index] = new_path
+            elif pattern == "binary" and self.binary_files:
+                path = self.rng.choice(self.binary_files)
+                with open(os.path.join(self.path, path), "wb") as f:
+                    f.write(self._binary())
+
+
+def run_size(args, file_count):
+    """Benchmark one repository size in this process and return its result dict"""
+    # The fake endpoint and a disabled message cache must be in place before git_details reads its env
+    server, base_url = start_fake_llm(args.llm_latency_ms)
+    os.environ.update(BENCH_IDENTITY)
+    os.environ["OPENROUTER_API_KEY"] = "benchmark"
+    os.environ["OPENROUTER_BASE_URL"] = base_url
+    os.environ["COMMIT_MESSAGE_CACHE_MAX_BYTES"] = "0"
+    sys.path.insert(0, REPO_ROOT)
+    import git_details
+    from utils.metrics import Metrics
+
+    class RecordingMetrics(Metrics):
+        """Metrics that also keep every raw observation for exact percentiles"""
+
+        def __init__(self):
+            super().__init__()
+            self.samples = {}
+
+        def observe(self, metric, value, **labels):
+            super().observe(metric, value, **labels)
+            key = labels.get("phase") or labels.get("kind") or metric
+            with self.lock:
+                self.samples.setdefault((metric, key), []).append(value)
+
+    recorder = RecordingMetrics()
+    git_details.metrics = recorder
+
+    root = tempfile.mkdtemp(prefix=f"bench-{file_count}-", dir=args.workdir)
+    try:
+        repo = SyntheticRepo(root, file_count, args.history, args.binary_files, args.binary_kb, args.seed)
+        started = time.perf_counter()
+        repo.create()
+        setup_seconds = time.perf_counter() - started
+
+        patterns = PATTERNS if args.pattern == "mixed" else [args.pattern]
+        cycles, idle_cycles, details = [], [], []
+        sink = io.StringIO()
+        for iteration in range(args.iterations):
+            repo.apply(patterns[iteration % len(patterns)], args.changes)
+            with redirect_stdout(sink):
+                started = time.perf_counter()
+                git_details.check_for_changes_and_commit(repo.path, diff_token_budget=args.diff_token_budget)
+                cycles.append(time.perf_counter() - started)
+
+                # The common case for a polled repository: nothing changed
+                started = time.perf_counter()
+                git_details.check_for_changes_and_commit(repo.path, diff_token_budget=args.diff_token_budget)
+                idle_cycles.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                git_details.get_git_details(repo.path)
+                details.append(time.perf_counter() - started)
+            sink.seek(0)
+            sink.truncate()
+
+        phases = {
+            key: percentiles(values)
+            for (metric, key), values in recorder.samples.items()
+            if metric == "autocommit_phase_duration_seconds"
+        }
+        return {
+            "files": file_count,
+            "history": args.history,
+            "binary_files": args.binary_files,
+            "pattern": args.pattern,
+            "changes_per_iteration": args.changes,
+            "iterations": args.iterations,
+            "setup_seconds": setup_seconds,
+            "cycle_seconds": percentiles(cycles),
+            "idle_cycle_seconds": percentiles(idle_cycles),
+            "details_seconds": percentiles(details),
+            "phase_seconds": phases,
+            "diff_bytes": percentiles(recorder.samples.get(("autocommit_diff_bytes", "autocommit_diff_bytes"), [])),
+            "llm_prompt_tokens": percentiles(recorder.samples.get(("autocommit_llm_tokens", "prompt"), [])),
+            # ru_maxrss is in KiB on Linux and bytes on macOS
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1),
+        }
+    finally:
+        server.shutdown()
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def tool_version():
+    """Commit of the tool being benchmarked, so results can be compared across versions"""
+    try:
+        return git(REPO_ROOT, "describe", "--always", "--dirty").decode().strip()
+    except (subprocess.CalledProcessError, OSError):
+        return "unknown"
+
+
+def print_result(result, baseline=None):
+    """Print a human-readable table for one size, with deltas against a baseline result"""
+    print(f"\n📊 {result['files']} files (setup {result['setup_seconds']:.1f}s, "
+          f"peak RSS {result['peak_rss_kb'] / 1024:.1f} MiB)")
+    rows = [("cycle", result["cycle_seconds"]), ("idle cycle", result["idle_cycle_seconds"]),
+            ("get_git_details", result["details_seconds"])]
+    rows += sorted(result["phase_seconds"].items())
+    base_rows = {}
+    if baseline:
+        base_rows = {"cycle": baseline["cycle_seconds"], "idle cycle": baseline["idle_cycle_seconds"],
+                     "get_git_details": baseline["details_seconds"], **baseline["phase_seconds"]}
+    print(f"   {'phase':<16} {'n':>5} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, stats in rows:
+        if not stats.get("count"):
+            continue
+        line = (f"   {name:<16} {stats['count']:>5} {stats['p50'] * 1000:>9.1f} {stats['p90'] * 1000:>9.1f} "
+                f"{stats['p99'] * 1000:>9.1f} {stats['max'] * 1000:>9.1f}")
+        base = base_rows.get(name)
+        if base and base.get("count") and base["p50"]:
+            line += f"   p50 {(stats['p50'] / base['p50'] - 1) * 100:+.0f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the auto-commit watcher on synthetic repositories")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Number of tracked files per generated repository (default: 1000 10000 100000)")
+    parser.add_argument("--history", type=int, default=50, help="Commits of history to generate (default: 50)")
+    parser.add_argument("--binary-files", type=int, default=20, help="Binary blobs in each repository (default: 20)")
+    parser.add_argument("--binary-kb", type=int, default=64, help="Size of each binary blob in KiB (default: 64)")
+    parser.add_argument("--pattern", choices=PATTERNS + ["mixed"], default="mixed",
+                        help="Kind of change applied before each cycle (default: mixed)")
+    parser.add_argument("--changes", type=int, default=5, help="Files changed before each cycle (default: 5)")
+    parser.add_argument("--iterations", type=int, default=20, help="Auto-commit cycles per size (default: 20)")
+    parser.add_argument("--diff-token-budget", type=int, default=750, help="Passed through to the watcher (default: 750)")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Artificial fake-LLM latency (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for content and change selection")
+    parser.add_argument("--workdir", type=str, default=None, help="Where to create repositories (default: system temp)")
+    parser.add_argument("--keep", action="store_true", help="Keep generated repositories for inspection")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this file")
+    parser.add_argument("--compare", type=str, default=None, help="Earlier JSON results to compare p50 latencies with")
+    parser.add_argument("--single-size", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single_size is not None:
+        # Child mode: one size per process so peak RSS is not inherited from larger runs
+        result = run_size(args, args.single_size)
+        print(json.dumps(result))
+        return
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = {result["files"]: result for result in json.load(f)["results"]}
+
+    results = []
+    for size in args.sizes:
+        print(f"⏱️  Benchmarking {size} files...", flush=True)
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *sys.argv[1:], "--single-size", str(size)],
+            capture_output=True,
+            text=True,
+        )
+        if child.returncode != 0:
+            print(f"❌ Benchmark for {size} files failed:\n{child.stderr}")
+            sys.exit(1)
+        # The result is the child's last line of output
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print_result(result, baseline.get(size))
+
+    report = {
+        "tool_version": tool_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git": git(REPO_ROOT, "--version").decode().strip(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
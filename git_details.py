@@ -1,63 +1,90 @@
 #!/usr/bin/env python3
 """
 Git Details Retriever and Auto-Commit/Push
-Checks for git changes every 30 seconds and auto-commits/pushes
+Watches for git changes (inotify events, or polling every 30 seconds) and auto-commits/pushes
 Uses OpenRouter LLM to generate intelligent commit messages
 """
 
-import subprocess
 import os
+import signal
 import sys
 import time
 import json
-import requests
 from datetime import datetime
 from dotenv import load_dotenv
 import re
+from concurrent.futures import ThreadPoolExecutor
+from utils.change_detector import ChangeDetector, enable_git_caches
+from utils.commit_heuristics import generate_heuristic_message, is_trivial_change
+from utils.commit_pipeline import CommitPipeline, PushPolicy
+from utils.commit_shards import index_info_lines, parse_ls_files_stage, partition_changes
+from utils.commit_message_cache import CommitMessageCache, cache_key
+from utils.commit_sequence import next_commit_number, record_commit_number
+from utils.details_cache import find_git_dirs, load_cached_details, stat_signature, store_cached_details
+from utils.diff_summary import parse_numstat, summarize_staged_diff
+from utils.file_watcher import GitIgnoreMatcher, InotifyWatcher, get_shared_inotify, global_excludes_file, inotify_available
+from utils.git_runner import GitRunner, format_oneline, format_short_status, parse_name_status
+from utils.llm_client import LLMClientError, get_llm_chain, set_llm_concurrency
+from utils.maintenance import RepoMaintenance
+from utils.metrics import Metrics
+from utils.snapshot_index import commit_snapshot_index, finish_snapshot_commit, snapshot_runner, sync_snapshot_index
+from utils.squash_push import micro_subjects, record_squash, resolve, squash_base, squash_number, squash_ref, upstream_of
+from utils.staging_guard import StagingGuard
+from utils.temp_index import TempIndex, advance_ref, commit_tree, head_state
+from utils.watch_scheduler import RepoWatch, WatchScheduler
+from utils.watch_state import open_watch_state
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Identical diffs (reverts, re-applied patches) reuse an earlier LLM answer
+message_cache = CommitMessageCache()
+
+# Oversized files and excluded patterns are never staged unless a watcher configures otherwise
+staging_guard = StagingGuard()
+
+# Per-phase timing spans (JSON log lines and a Prometheus textfile when configured)
+metrics = Metrics()
 
-def run_git_command(command):
-    """Run a git command and return the output"""
-    try:
-        result = subprocess.run(
-            command,
-            shell=True,
-            cwd=os.path.dirname(os.path.abspath(__file__)),
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        return f"Error: {e.stderr.strip()}"
 
+def slugify_commit_message(message):
+    """Lowercase a commit message and reduce it to letters, digits, hyphens and colons"""
+    # Remove any quotes or extra formatting
+    commit_message = message.strip().strip('"\'')
+    # Slugify: lowercase, replace spaces and special chars with hyphens
+    commit_message = re.sub(r'[^a-z0-9\-:]+', '-', commit_message.lower())
+    commit_message = re.sub(r'-+', '-', commit_message)  # Remove multiple hyphens
+    return commit_message.strip('-')  # Remove leading/trailing hyphens
 
-def generate_commit_message_with_llm(changed_files, diff_content):
-    """Generate an intelligent commit message using OpenRouter LLM"""
+
+def generate_commit_message_with_llm(changed_files, diff_summary, repo_path=None, fallback="update-files"):
+    """Generate an intelligent commit message using OpenRouter LLM (fallback if it cannot)"""
+    
+    # Skip the network round-trip entirely if this exact change was summarized before
+    key = cache_key(changed_files, diff_summary)
+    cached_message = message_cache.get(key)
+    if cached_message:
+        stats = message_cache.stats()
+        print(f"💾 Cached commit message: {cached_message} ({stats['hits']} hits / {stats['misses']} misses)")
+        return cached_message
     
     # Get OpenRouter API key from environment
     api_key = os.environ.get('OPENROUTER_API_KEY')
     
     if not api_key:
-        print("⚠️  OPENROUTER_API_KEY not found in environment. Using default message.")
-        return "update-files"
+        print("⚠️  OPENROUTER_API_KEY not found in environment. Using fallback message.")
+        return fallback
     
     # Prepare the prompt
     file_list = "\n".join([f"- {f}" for f in changed_files])
     
-    # Limit diff content to avoid token limits
-    truncated_diff = diff_content[:3000] if len(diff_content) > 3000 else diff_content
-    
     prompt = f"""You are a Git commit message expert. Generate a concise, conventional commit message based on the following changes.
 
 Changed files:
 {file_list}
 
 Diff summary:
-{truncated_diff}
+{diff_summary}
 
 Requirements:
 - Use conventional commit format (e.g., feat:, fix:, docs:, refactor:, style:, test:, chore:)
@@ -72,46 +99,49 @@ Requirements:
 Generate ONLY the commit message, nothing else. Example: feat: update configuration or fix: resolve parsing bug"""
 
     try:
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://github.com",
-                "X-Title": "Git Auto-Commit Tool"
-            },
-            json={
-                "model": "google/gemma-3-27b-it:free",
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "max_tokens": 100,
-                "temperature": 0.7
-            },
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            commit_message = result['choices'][0]['message']['content'].strip()
-            # Remove any quotes or extra formatting
-            commit_message = commit_message.strip('"\'')
-            # Slugify: lowercase, replace spaces and special chars with hyphens
-            commit_message = re.sub(r'[^a-z0-9\-:]+', '-', commit_message.lower())
-            commit_message = re.sub(r'-+', '-', commit_message)  # Remove multiple hyphens
-            commit_message = commit_message.strip('-')  # Remove leading/trailing hyphens
-            print(f"🤖 LLM-generated commit message: {commit_message}")
-            return commit_message
-        else:
-            print(f"⚠️  OpenRouter API error ({response.status_code}): {response.text}")
-            return "update-files"
-            
+        # Pooled keep-alive connections; a slow provider is hedged with the next one within the latency budget
+        with metrics.span("llm", repo_path, files=len(changed_files)) as span:
+            content, usage, provider = get_llm_chain(api_key).complete([
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ])
+            span["provider"] = provider
+            span.update({key: value for key, value in usage.items() if key.endswith("_tokens")})
+        metrics.record_llm_tokens(repo_path, usage)
+        commit_message = slugify_commit_message(content)
+        print(f"🤖 LLM-generated commit message ({provider}): {commit_message}")
+        if not commit_message:
+            return fallback
+        message_cache.put(key, commit_message)
+        return commit_message
+    
+    except LLMClientError as e:
+        print(f"⚠️  OpenRouter API error {e}")
+        return fallback
     except Exception as e:
         print(f"⚠️  Error calling OpenRouter API: {e}")
-        return "update-files"
+        return fallback
+
+
+def generate_commit_message(snapshot, repo_path=None, message_mode="auto"):
+    """Use the local heuristic for trivial changesets (or always, or never) and the LLM otherwise"""
+    with metrics.span("heuristic", repo_path):
+        heuristic_message = slugify_commit_message(
+            generate_heuristic_message(snapshot["changes"], snapshot["numstat"], snapshot["diff_summary"])
+        )
+    
+    if message_mode == "heuristic" or (
+        message_mode == "auto" and is_trivial_change(snapshot["changes"], snapshot["numstat"])
+    ):
+        print(f"⚡ Heuristic commit message: {heuristic_message}")
+        return heuristic_message
+    
+    # The heuristic also stands in when the LLM is unavailable or fails
+    return generate_commit_message_with_llm(
+        snapshot["files"], snapshot["diff_summary"], repo_path, fallback=heuristic_message
+    )
 
 
 def format_commit_id(commit_number, message):
@@ -120,185 +150,858 @@ def format_commit_id(commit_number, message):
     return f"{commit_number:03d}-{message}"
 
 
-def get_git_details():
+def get_git_details(repo_path=None):
     """Retrieve various git details about the repository"""
     
     print("=" * 60)
     print("GIT REPOSITORY DETAILS")
     print("=" * 60)
     
-    # Current directory
-    current_dir = os.path.dirname(os.path.abspath(__file__))
+    # Repository directory (defaults to this script's directory)
+    current_dir = os.path.abspath(repo_path or os.path.dirname(os.path.abspath(__file__)))
     print(f"\nDirectory: {current_dir}")
     
-    # Check if it's a git repository
-    is_git_repo = run_git_command("git rev-parse --is-inside-work-tree")
-    if "Error" in is_git_repo or is_git_repo != "true":
+    # One log, for-each-ref, status, config and rev-list call, run concurrently
+    details = GitRunner(current_dir).details(recent=5)
+    if details is None:
         print("\n❌ This is not a git repository!")
         return
     
     print("\n✓ Valid Git Repository\n")
     
     # Current branch
-    branch = run_git_command("git branch --show-current")
-    print(f"Current Branch: {branch}")
+    print(f"Current Branch: {details['branch'] or ''}")
     
     # Latest commit
-    commit_hash = run_git_command("git rev-parse HEAD")
-    print(f"Latest Commit Hash: {commit_hash}")
+    head = details["head"] or {}
+    print(f"Latest Commit Hash: {head.get('hash', '')}")
     
     # Commit message
-    commit_message = run_git_command("git log -1 --pretty=%B")
-    print(f"Latest Commit Message: {commit_message}")
+    print(f"Latest Commit Message: {head.get('message', '')}")
     
     # Commit author and date
-    commit_author = run_git_command("git log -1 --pretty=format:'%an <%ae>'")
-    commit_date = run_git_command("git log -1 --pretty=format:'%ad'")
+    commit_author = f"{head['author_name']} <{head['author_email']}>" if head else ""
     print(f"Commit Author: {commit_author}")
-    print(f"Commit Date: {commit_date}")
+    print(f"Commit Date: {head.get('date', '')}")
     
     # Remote URL
-    remote_url = run_git_command("git config --get remote.origin.url")
-    print(f"\nRemote Origin URL: {remote_url}")
+    print(f"\nRemote Origin URL: {details['remote_url']}")
     
     # Repository status
     print("\n" + "-" * 60)
     print("REPOSITORY STATUS")
     print("-" * 60)
-    status = run_git_command("git status --short")
+    status = format_short_status(details["status"]["entries"])
     if status:
         print(status)
     else:
         print("✓ Working tree clean")
     
     # Number of commits
-    commit_count = run_git_command("git rev-list --count HEAD")
-    print(f"\nTotal Commits: {commit_count}")
+    print(f"\nTotal Commits: {details['commit_count']}")
     
     # List of branches
     print("\n" + "-" * 60)
     print("LOCAL BRANCHES")
     print("-" * 60)
-    branches = run_git_command("git branch")
-    print(branches)
+    for branch in details["branches"]:
+        marker = "*" if branch == details["branch"] else " "
+        print(f"{marker} {branch}")
     
     # Recent commits (last 5)
     print("\n" + "-" * 60)
     print("RECENT COMMITS (Last 5)")
     print("-" * 60)
-    recent_commits = run_git_command("git log -5 --oneline --decorate")
-    print(recent_commits)
+    for commit in details["recent_commits"]:
+        print(format_oneline(commit))
     
     print("\n" + "=" * 60)
 
 
-def check_for_changes_and_commit(watch_path):
-    """Check for git changes and commit/push if any exist"""
-    try:
-        # Change to the watch directory
-        original_dir = os.getcwd()
-        os.chdir(watch_path)
-        
-        # Check for changes
-        status = run_git_command("git status --porcelain")
-        
-        if not status:
-            print("✓ No changes detected", end="\r")
-            os.chdir(original_dir)
-            return False
-        
-        print("\n" + "🔄 " * 30)
-        print("CHANGES DETECTED - AUTO-COMMITTING")
-        print("🔄 " * 30)
-        
-        # Add all changes
-        print("\n📦 Staging changes...")
-        run_git_command("git add .")
-        
-        # Get list of changed files
-        changed_files = run_git_command("git diff --cached --name-only")
-        file_list = changed_files.split('\n') if changed_files else []
-        
-        print(f"📝 Changed files: {len(file_list)}")
-        for file in file_list[:5]:  # Show first 5 files
-            print(f"   - {file}")
-        if len(file_list) > 5:
-            print(f"   ... and {len(file_list) - 5} more")
-        
-        # Get diff for context
-        full_diff = run_git_command("git diff --cached")
-        
+CONFLICT_CODES = {"DD", "AU", "UD", "UA", "DU", "AA", "UU"}
+
+
+def count_dirty(entries):
+    """Staged/unstaged/untracked/conflicted counts from parsed status entries"""
+    counts = {"staged": 0, "unstaged": 0, "untracked": 0, "conflicted": 0}
+    for entry in entries:
+        xy = entry["xy"]
+        if xy == "??":
+            counts["untracked"] += 1
+        elif xy in CONFLICT_CODES:
+            counts["conflicted"] += 1
+        elif xy != "!!":
+            counts["staged"] += xy[0] != "."
+            counts["unstaged"] += xy[1] != "."
+    return counts
+
+
+def git_details_record(repo_path=None, max_age=60):
+    """Repository details as a JSON-ready dict, served from the stat-validated cache when nothing moved"""
+    current_dir = os.path.abspath(repo_path or os.path.dirname(os.path.abspath(__file__)))
+    git_dirs = find_git_dirs(current_dir)
+    if git_dirs is None:
+        return {"path": current_dir, "error": "not a git repository"}
+    
+    # Stat before running git, so a change that races the refresh invalidates it next time
+    signature = stat_signature(*git_dirs)
+    if max_age >= 0:
+        cached = load_cached_details(git_dirs[0], signature, max_age)
+        if cached is not None:
+            return dict(cached, cached=True)
+    
+    details = GitRunner(current_dir).details(recent=5)
+    if details is None:
+        return {"path": current_dir, "error": "not a git repository"}
+    head = details["head"] or {}
+    record = {
+        "path": current_dir,
+        "branch": details["branch"],
+        "head": head.get("hash"),
+        "message": head.get("message"),
+        "author": f"{head['author_name']} <{head['author_email']}>" if head else None,
+        "date": head.get("date"),
+        "remote_url": details["remote_url"] or None,
+        "upstream": details["status"]["upstream"],
+        "ahead": details["status"]["ahead"],
+        "behind": details["status"]["behind"],
+        "dirty": count_dirty(details["status"]["entries"]),
+        "commit_count": details["commit_count"],
+        "branches": details["branches"],
+        "recent_commits": [
+            {key: commit[key] for key in ("hash", "subject", "author_name", "author_email", "date")}
+            for commit in details["recent_commits"]
+        ],
+        "generated_at": datetime.now().astimezone().isoformat(timespec="seconds"),
+    }
+    if max_age >= 0:
+        store_cached_details(git_dirs[0], signature, record)
+    return dict(record, cached=False)
+
+
+def print_git_details_json(repo_paths, max_age=60):
+    """Print one JSON line per repository (NDJSON)"""
+    for repo_path in repo_paths or [None]:
+        print(json.dumps(git_details_record(repo_path, max_age), ensure_ascii=False), flush=True)
+
+
+def read_change_set(runner, untracked_files="normal"):
+    """Return the working tree's change entries from `git status --porcelain=v2 -z` (empty if clean)"""
+    status = runner.status(untracked_files, refresh_index=True)
+    return status["entries"] if status else []
+
+
+def change_set_paths(changes):
+    """Paths with unstaged or untracked changes; already-staged entries need no restaging"""
+    return [entry["path"] for entry in changes if entry["xy"][1] != "."]
+
+
+def status_fingerprint(runner, changes):
+    """Fingerprint a change set by the paths it lists and their size/mtime"""
+    fingerprint = []
+    for entry in changes:
+        path = entry["path"]
+        try:
+            stat = os.stat(os.path.join(runner.repo_path, path))
+            fingerprint.append((entry["xy"], path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            fingerprint.append((entry["xy"], path, None, None))
+    return fingerprint
+
+
+def wait_for_quiet_tree(runner, changes, settle_seconds, max_wait_seconds, untracked_files="normal"):
+    """Re-check the working tree until it stops changing for settle_seconds (capped at max_wait_seconds)"""
+    deadline = time.monotonic() + max_wait_seconds
+    fingerprint = status_fingerprint(runner, changes)
+    
+    while time.monotonic() < deadline:
+        time.sleep(min(settle_seconds, max(deadline - time.monotonic(), 0)))
+        changes = read_change_set(runner, untracked_files)
+        new_fingerprint = status_fingerprint(runner, changes)
+        if new_fingerprint == fingerprint:
+            break
+        fingerprint = new_fingerprint
+    
+    return changes
+
+
+def report_skipped(runner, guard, skipped):
+    """Print files the staging guard held back, once per version of each file"""
+    fresh = guard.new_reports(runner, skipped)
+    if not fresh:
+        return
+    print(f"\n🚧 Not staging {len(fresh)} files:")
+    for path, reason in fresh[:10]:
+        print(f"   - {path} ({reason})")
+    if len(fresh) > 10:
+        print(f"   ... and {len(fresh) - 10} more")
+
+
+def prepare_auto_commit(runner, settle_seconds=0, max_wait_seconds=0, diff_token_budget=750,
+                        detector=None, untracked_files="normal", guard=None, shard_depth=0, max_shards=8,
+                        snapshot_mode=False):
+    """Detect, settle and stage changes; return a snapshot to commit, or None if the tree is clean"""
+    repo_path = runner.repo_path
+    if snapshot_mode:
+        # runner (and detector) use the private index; re-seed it if someone else moved HEAD
+        with metrics.span("sync-index", repo_path):
+            sync_snapshot_index(runner)
+    
+    # Cheap tiers first: directory snapshot, then `git diff-index --quiet HEAD`
+    if detector:
+        with metrics.span("detect", repo_path) as span:
+            maybe_changed = detector.maybe_changed()
+            span["tier"] = detector.last_tier
+        if not maybe_changed:
+            print(f"✓ No changes detected ({detector.last_tier})", end="\r")
+            return None
+    
+    # Check for changes
+    with metrics.span("status", repo_path) as span:
+        changes = read_change_set(runner, untracked_files)
+        span["entries"] = len(changes)
+    if detector:
+        detector.track_unstaged([])  # Re-recorded below for whatever the guard skips this time
+    
+    if not changes:
+        print("✓ No changes detected", end="\r")
+        return None
+    
+    # Coalesce bursts of edits (editor save storms, code generators) into one commit
+    if settle_seconds > 0:
+        print(f"\n⏳ Changes detected, waiting for {settle_seconds * 1000:.0f} ms of quiet...")
+        with metrics.span("settle", repo_path):
+            changes = wait_for_quiet_tree(runner, changes, settle_seconds, max_wait_seconds, untracked_files)
+        if not changes:
+            print("✓ Changes were reverted while settling", end="\r")
+            return None
+    
+    # Oversized and excluded files stay out of the index so memory and push size stay bounded
+    guard = guard or staging_guard
+    paths = change_set_paths(changes)
+    # update-index needs both sides of a rename to stage the removal of the old path
+    paths += [entry["orig_path"] for entry in changes if entry["orig_path"]]
+    to_stage, skipped = guard.filter(runner, paths)
+    already_staged = any(entry["xy"][0] not in ".?!" for entry in changes)
+    if detector:
+        # Tier 1 re-checks these, since neither directory mtimes nor diff-index see them change
+        detector.track_unstaged([path for path, _reason in skipped])
+    if skipped:
+        report_skipped(runner, guard, skipped)
+    if not to_stage and not already_staged:
+        print("✓ No stageable changes", end="\r")
+        return None
+    
+    print("\n" + "🔄 " * 30)
+    print("CHANGES DETECTED - AUTO-COMMITTING")
+    print("🔄 " * 30)
+    
+    # Stage exactly the paths status reported instead of rescanning the whole tree; literal paths
+    # over stdin cost O(paths), where pathspecs for `git add` are matched against each other
+    print(f"\n📦 Staging {len(to_stage)} changed paths...")
+    with metrics.span("add", repo_path, paths=len(to_stage), skipped=len(skipped)):
+        add_result = runner.update_index_paths(to_stage)
+    if add_result.startswith("Error"):
+        print(f"⚠️  Staging failed: {add_result}")
+    
+    # Get list of changed files (with add/modify/delete/rename status for the message heuristics)
+    name_status = runner.run("diff", "--cached", "--name-status", "-z")
+    staged = [] if name_status.startswith("Error") else parse_name_status(name_status)
+    file_list = [entry["path"] for entry in staged]
+    if not file_list:
+        print("✓ Nothing staged", end="\r")
+        return None
+    
+    print(f"📝 Changed files: {len(file_list)}")
+    for file in file_list[:5]:  # Show first 5 files
+        print(f"   - {file}")
+    if len(file_list) > 5:
+        print(f"   ... and {len(file_list) - 5} more")
+    
+    # Large change sets can be split by directory; each shard is summarized when its message is generated
+    if shard_depth > 0:
+        shards = partition_changes(staged, shard_depth, max_shards)
+        if len(shards) > 1:
+            return {
+                "path": runner.repo_path,
+                "files": file_list,
+                "changes": staged,
+                "shards": shards,
+                "diff_token_budget": diff_token_budget,
+                "skipped": skipped,
+                "index_file": runner.env.get("GIT_INDEX_FILE"),
+            }
+    
+    # Summarize the most informative hunks within the token budget (streamed, memory-capped)
+    with metrics.span("diff", repo_path) as span:
+        diff_stats = {}
+        diff_summary = summarize_staged_diff(runner, diff_token_budget, diff_stats)
+        span["bytes"] = diff_stats.get("diff_bytes", 0)
+    metrics.record_diff_bytes(repo_path, span["bytes"])
+    
+    return {
+        "path": runner.repo_path,
+        "files": file_list,
+        "changes": staged,
+        "numstat": diff_stats.get("numstat", []),
+        "diff_summary": diff_summary,
+        "skipped": skipped,
+        "index_file": runner.env.get("GIT_INDEX_FILE"),
+    }
+
+
+def snapshot_paths(snapshot):
+    """Every path a snapshot commit touches, including the old side of renames"""
+    return [entry["path"] for entry in snapshot["changes"]] + [
+        entry["orig_path"] for entry in snapshot["changes"] if entry["orig_path"]
+    ]
+
+
+def runner_for_snapshot(snapshot):
+    """GitRunner for a prepared snapshot, on the private index if it was staged there"""
+    if snapshot.get("index_file"):
+        return GitRunner(snapshot["path"], env={"GIT_INDEX_FILE": snapshot["index_file"]})
+    return GitRunner(snapshot["path"])
+
+
+def generate_shard_message(runner, shard_entries, numstat, diff_token_budget, message_mode="auto"):
+    """Summarize one shard of the staged changes and generate its commit message"""
+    paths = {entry["path"] for entry in shard_entries}
+    diff_stats = {}
+    with metrics.span("diff", runner.repo_path, shard=True):
+        diff_summary = summarize_staged_diff(
+            runner, diff_token_budget, diff_stats, [entry for entry in numstat if entry[2] in paths]
+        )
+    shard_snapshot = {
+        "files": [entry["path"] for entry in shard_entries],
+        "changes": shard_entries,
+        "numstat": diff_stats.get("numstat", []),
+        "diff_summary": diff_summary,
+    }
+    return generate_commit_message(shard_snapshot, runner.repo_path, message_mode)
+
+
+def commit_sharded_changes(runner, snapshot, message_mode="auto"):
+    """Commit each directory shard of a snapshot separately through a private index; return the commit count"""
+    shards = snapshot["shards"]
+    names = ", ".join(key or "(top level)" for key, _entries in shards)
+    print(f"\n🧩 Splitting {len(snapshot['files'])} files into {len(shards)} commits: {names}")
+    
+    # One numstat of the whole staged diff is split between the shards: a pathspec per file
+    # would not fit on the command line for the large change sets sharding is meant for
+    numstat_output = runner.run("diff", "--cached", "-M", "--numstat", "-z")
+    numstat = [] if numstat_output.startswith("Error") else parse_numstat(numstat_output)
+    
+    # Every shard's LLM round-trip runs at once instead of one after another
+    print("\n🤖 Generating commit messages in parallel...")
+    with ThreadPoolExecutor(max_workers=len(shards), thread_name_prefix="shard") as executor:
+        messages = list(executor.map(
+            lambda shard: generate_shard_message(
+                runner, shard[1], numstat, snapshot["diff_token_budget"], message_mode
+            ),
+            shards,
+        ))
+    
+    with metrics.span("sequence", runner.repo_path):
+        commit_number = next_commit_number(runner)
+    
+    # Build the commits one after another from a private index seeded with HEAD, then
+    # move the branch once; the staging index is only read (it already matches the final tree)
+    staged_index = parse_ls_files_stage(runner.run("ls-files", "-s", "-z"))
+    ref, head = head_state(runner)
+    parent = head
+    with metrics.span("commit", runner.repo_path, files=len(snapshot["files"]), shards=len(shards)):
+        with TempIndex(runner, head) as index:
+            for (_key, entries), message in zip(shards, messages):
+                result = index.update_index_info(index_info_lines(staged_index, entries))
+                if result.startswith("Error"):
+                    raise RuntimeError(result)
+                commit_msg = format_commit_id(commit_number, message)
+                parent = commit_tree(runner, index.write_tree(), parent, commit_msg)
+                print(f"💾 Committing: {commit_msg} ({len(entries)} files)")
+                commit_number += 1
+        if not advance_ref(runner, ref, parent, head, f"auto-commit: {len(shards)} sharded commits"):
+            print("❌ The branch moved while committing; leaving the changes staged for the next check")
+            return 0
+    
+    print(f"[{ref.replace('refs/heads/', '')} {parent[:7]}] {len(shards)} commits")
+    if snapshot.get("index_file"):
+        finish_snapshot_commit(runner, parent, snapshot_paths(snapshot))
+    with metrics.span("sequence", runner.repo_path):
+        record_commit_number(runner, commit_number - 1)
+    return len(shards)
+
+
+def commit_staged_changes(runner, snapshot, message_mode="auto", state=None):
+    """Generate a message for a prepared snapshot and commit it locally; return True (or the commit count) on success"""
+    if snapshot.get("shards"):
+        return commit_sharded_changes(runner, snapshot, message_mode)
+    
+    # A snapshot staged before a crash or restart gets the message it was given then
+    message_key = cache_key(snapshot["files"], snapshot["diff_summary"])
+    base_message = state.get_message(message_key) if state else None
+    if base_message:
+        print(f"\n♻️  Reusing the commit message already chosen for this change: {base_message}")
+    else:
         # Use LLM to generate commit message
         print("\n🤖 Generating intelligent commit message...")
-        base_message = generate_commit_message_with_llm(file_list, full_diff)
-        
-        # Get current commit count and increment for next commit ID
-        commit_count = run_git_command("git rev-list --count HEAD")
-        try:
-            next_commit_id = int(commit_count) + 1
-        except ValueError:
-            next_commit_id = 1
-        
-        # Format commit message with ID
-        commit_msg = format_commit_id(next_commit_id, base_message)
-        
-        # Commit
-        print(f"\n💾 Committing: {commit_msg}")
-        commit_result = run_git_command(f'git commit -m "{commit_msg}"')
+        base_message = generate_commit_message(snapshot, runner.repo_path, message_mode)
+        if state:
+            state.put_message(message_key, base_message)
+    
+    # Next commit ID from the persisted sequence (no full history walk)
+    with metrics.span("sequence", runner.repo_path):
+        next_commit_id = next_commit_number(runner)
+    
+    # Format commit message with ID
+    commit_msg = format_commit_id(next_commit_id, base_message)
+    
+    # Commit
+    print(f"\n💾 Committing: {commit_msg}")
+    if snapshot.get("index_file"):
+        # Plumbing commit from the private index; fails safely if the branch moved meanwhile
+        with metrics.span("commit", runner.repo_path, files=len(snapshot["files"]), snapshot=True):
+            commit = commit_snapshot_index(runner, commit_msg, snapshot_paths(snapshot))
+        if commit is None:
+            print("❌ The branch moved while committing; the changes will be picked up by the next check")
+            return False
+        print(f"[{commit[:7]}] {commit_msg}")
+    else:
+        with metrics.span("commit", runner.repo_path, files=len(snapshot["files"])):
+            commit_result = runner.run("commit", "-m", commit_msg)
         print(commit_result)
+        if commit_result.startswith("Error"):
+            return False
+    
+    with metrics.span("sequence", runner.repo_path):
+        record_commit_number(runner, next_commit_id)
+    if state:
+        state.drop_message(message_key)
+    return True
+
+
+def push_changes(runner, commit_count=1):
+    """Push the current branch to its remote; return True on success"""
+    if commit_count > 1:
+        print(f"\n🚀 Pushing {commit_count} commits to remote repository ({os.path.basename(runner.repo_path)})...")
+    else:
+        print(f"\n🚀 Pushing to remote repository ({os.path.basename(runner.repo_path)})...")
+    with metrics.span("push", runner.repo_path, commits=commit_count) as span:
+        push_result = runner.run("push")
+        span["ok"] = "Error" not in push_result
+    
+    if "Error" not in push_result:
+        print("✅ Successfully pushed to remote!")
+        if push_result:
+            print(push_result)
+        return True
+    
+    print(f"❌ Push failed: {push_result}")
+    return False
+
+
+def push_squashed_changes(runner, commit_count=1, message_mode="auto", max_subjects=50):
+    """Push the branch's micro-commits as a single squashed commit on top of its upstream; True on success"""
+    ref, head = head_state(runner)
+    upstream = upstream_of(runner, ref) if head and ref.startswith("refs/heads/") else None
+    base = resolve(runner, upstream[2]) if upstream else None
+    if base is None:
+        # Detached, unborn, or never pushed: nothing to squash onto
+        return push_changes(runner, commit_count)
+    remote, remote_ref, _tracking_ref = upstream
+    covered = resolve(runner, squash_ref(ref))
+    if not squash_base(runner, head, base, covered):
+        print(f"⚠️  {ref} has diverged from {upstream[2]}; pushing without squashing")
+        return push_changes(runner, commit_count)
+    
+    subjects = micro_subjects(runner, head, base, covered)
+    if not subjects:
+        return True
+    if len(subjects) == 1 and runner.run("rev-parse", f"{head}^") == base:
+        return push_changes(runner, commit_count)  # A single commit is already its own squash
+    
+    # The squashed commit's message is generated from the combined diff and the micro-commit subjects
+    with metrics.span("squash", runner.repo_path, commits=len(subjects)):
+        changes = parse_name_status(runner.run("diff", "--name-status", "-z", "-M", base, head))
+        numstat = parse_numstat(runner.run("diff", "--numstat", "-z", "-M", base, head))
+    listed = [re.sub(r"^\d+-", "", subject) for subject in subjects[-max_subjects:]]
+    diff_summary = f"Squashing {len(subjects)} auto-commits:\n" + "\n".join(f"- {subject}" for subject in listed)
+    snapshot = {
+        "files": [entry["path"] for entry in changes],
+        "changes": changes,
+        "numstat": numstat,
+        "diff_summary": diff_summary,
+    }
+    print(f"\n🗜️  Squashing {len(subjects)} commits for {os.path.basename(runner.repo_path)}...")
+    message = generate_commit_message(snapshot, runner.repo_path, message_mode)
+    
+    commit_number = squash_number(runner, head, base, covered)
+    commit_msg = format_commit_id(commit_number, message)
+    squashed = commit_tree(runner, f"{head}^{{tree}}", base, commit_msg)
+    
+    print(f"🚀 Pushing {commit_msg} ({len(subjects)} commits squashed) to {remote}...")
+    with metrics.span("push", runner.repo_path, commits=commit_count, squashed=len(subjects)) as span:
+        push_result = runner.run("push", remote, f"{squashed}:{remote_ref}")
+        span["ok"] = "Error" not in push_result
+    if "Error" in push_result:
+        print(f"❌ Push failed: {push_result}")
+        return False
+    print("✅ Successfully pushed to remote!")
+    
+    # Same tree as head, so moving the branch leaves the working tree and index alone
+    if record_squash(runner, ref, head, squashed, commit_msg):
+        record_commit_number(runner, commit_number)
+    else:
+        print(f"⚠️  {ref} moved during the push; the next squash builds on {squashed[:7]}")
+    return True
+
+
+def check_for_changes_and_commit(watch_path, settle_seconds=0, max_wait_seconds=0, diff_token_budget=750,
+                                 message_mode="auto", shard_depth=0, max_shards=8, snapshot_mode=False):
+    """Check for git changes and commit/push if any exist"""
+    # Every git call goes through an explicit repository context, never the process cwd,
+    # so several repositories can be checked from parallel threads
+    runner = GitRunner(watch_path)
+    if shard_depth > 0:
+        set_llm_concurrency(max_shards)
+    try:
+        if snapshot_mode:
+            runner = snapshot_runner(runner)
+        snapshot = prepare_auto_commit(
+            runner,
+            settle_seconds,
+            max_wait_seconds,
+            diff_token_budget,
+            shard_depth=shard_depth,
+            max_shards=max_shards,
+            snapshot_mode=snapshot_mode
+        )
+        if snapshot is None:
+            return False
         
-        # Push to remote
-        print("\n🚀 Pushing to remote repository...")
-        push_result = run_git_command("git push")
-        
-        if "Error" not in push_result:
-            print("✅ Successfully pushed to remote!")
-            if push_result:
-                print(push_result)
-        else:
-            print(f"❌ Push failed: {push_result}")
+        committed = commit_staged_changes(runner, snapshot, message_mode)
+        if committed:
+            push_changes(runner, int(committed))
         
         print("\n" + "🔄 " * 30)
         
-        os.chdir(original_dir)
         return True
         
     except Exception as e:
         print(f"\n❌ Error during auto-commit: {e}")
-        os.chdir(original_dir)
         return False
 
 
-def start_auto_commit_watch(watch_path, check_interval=30):
-    """Periodically check for changes and auto-commit/push"""
+def create_file_watcher(watch_path, watch_mode="auto"):
+    """Create an inotify watcher for watch_path, or return None to fall back to polling"""
+    if watch_mode == "poll":
+        return None
+    
+    if not inotify_available():
+        if watch_mode == "inotify":
+            raise RuntimeError("inotify watch mode requested but inotify is not available")
+        print("⚠️  inotify not available on this platform. Falling back to polling.")
+        return None
+    
+    # Tracked files matching an ignore rule must still trigger a commit
+    runner = GitRunner(watch_path)
+    tracked_ignored = runner.run("ls-files", "-z", "-ci", "--exclude-standard")
+    if tracked_ignored.startswith("Error"):
+        tracked_ignored = ""
+    matcher = GitIgnoreMatcher(
+        watch_path,
+        always_include=[path for path in tracked_ignored.split("\0") if path],
+        excludes_file=global_excludes_file(runner),
+    )
+    
+    try:
+        # Every repository shares one inotify instance (fs.inotify.max_user_instances is often 128)
+        return InotifyWatcher(watch_path, matcher, get_shared_inotify())
+    except OSError as e:
+        if watch_mode == "inotify":
+            raise
+        print(f"⚠️  Could not start inotify watcher ({e}). Falling back to polling.")
+        return None
+
+
+def start_auto_commit_watch(watch_paths, check_interval=30, watch_mode="auto", settle_ms=2000,
+                            max_wait_ms=30000, workers=4, min_gap=5, diff_token_budget=750,
+                            message_workers=2, push_interval=30, push_after_commits=10,
+                            untracked_files="normal", untracked_cache=False, fsmonitor=False,
+                            max_interval=300, message_mode="auto", max_file_mb=10,
+                            exclude_patterns=None, oversize_action="skip", shard_depth=0, max_shards=8,
+                            snapshot_mode=False, maintenance_interval=60, maintenance_idle=120,
+                            maintenance_budget=60, squash_push=False, persist_state=True):
+    """Watch one or more repositories and auto-commit/push, all from a single scheduler"""
+    if isinstance(watch_paths, str):
+        watch_paths = [watch_paths]
+    settle_seconds = settle_ms / 1000
+    max_wait_seconds = max(max_wait_ms, settle_ms) / 1000
+    guard = StagingGuard(int(max_file_mb * 1024 * 1024), exclude_patterns, oversize_action)
+    # Every commit worker may generate all of its shard messages at once
+    set_llm_concurrency(max(1, message_workers) * (max_shards if shard_depth > 0 else 1))
+    maintenance = None
+    if maintenance_interval > 0:
+        maintenance = RepoMaintenance(maintenance_interval * 60, maintenance_idle, maintenance_budget, metrics=metrics)
+    
     print("\n" + "👁️ " * 30)
     print("STARTING AUTO-COMMIT MODE")
     print("👁️ " * 30)
-    print(f"\nWatching directory: {watch_path}")
-    print(f"Checking for changes every {check_interval} seconds...")
+    
+    def commit_snapshot(snapshot):
+        return commit_staged_changes(
+            runner_for_snapshot(snapshot), snapshot, message_mode, states.get(snapshot["path"])
+        )
+    
+    def push_repo(path, commit_count):
+        if squash_push:
+            return push_squashed_changes(GitRunner(path), commit_count, message_mode)
+        return push_changes(GitRunner(path), commit_count)
+    
+    def check_repo(repo):
+        # A snapshot still waiting for its commit owns the index; look again once it is committed
+        if pipeline.is_busy(repo.path):
+            return False
+        
+        repo.check_count += 1
+        state = states.get(repo.path)
+        if state:
+            state.set("check_count", repo.check_count)
+        current_time = datetime.now().strftime("%H:%M:%S")
+        depths = pipeline.depths()
+        mode = "inotify" if repo.watcher else f"every {repo.interval.current:g}s"
+        print(
+            f"[{current_time}] {repo.name} check #{repo.check_count} ({mode}, "
+            f"queued: {depths['commit']} commit, {depths['push']} push): ",
+            end="",
+            flush=True
+        )
+        # Event-driven repos have already settled in the scheduler; polled repos settle inside the check
+        runner = runners[repo.path]
+        detector = detectors.get(repo.path)
+        if repo.watcher and detector:
+            # Keep the clean-tree fingerprint current by re-reading the mtimes of just the directories
+            # inotify saw change, before status looks at them (a warm start compares them all anyway)
+            dirty_dirs = repo.watcher.take_dirty_dirs()
+            if repo.path not in warm_starts:
+                detector.dir_mtimes = detector.refreshed(dirty_dirs)
+        if repo.watcher:
+            # A repository resumed from a clean fingerprint is first checked through the cheap tiers
+            snapshot = prepare_auto_commit(
+                runner,
+                detector=detector if repo.path in warm_starts else None,
+                diff_token_budget=diff_token_budget,
+                untracked_files=untracked_files,
+                guard=guard,
+                shard_depth=shard_depth,
+                max_shards=max_shards,
+                snapshot_mode=snapshot_mode
+            )
+        else:
+            snapshot = prepare_auto_commit(
+                runner,
+                settle_seconds,
+                max_wait_seconds,
+                diff_token_budget,
+                detector=detector,
+                untracked_files=untracked_files,
+                guard=guard,
+                shard_depth=shard_depth,
+                max_shards=max_shards,
+                snapshot_mode=snapshot_mode
+            )
+        warm_starts.discard(repo.path)
+        if snapshot is None:
+            remember_clean_tree(repo, runner)
+            # Idle and clean: a good moment to pack objects, unless a push is still reading them
+            # (on the maintenance thread, so check workers stay free for other repositories)
+            if maintenance and maintenance.due(repo.path) and pipeline.is_idle(repo.path):
+                maintenance.request(GitRunner(repo.path), can_run=maintenance_can_run)
+            return False
+        
+        if maintenance:
+            maintenance.record_activity(repo.path)
+        if repo.path in fingerprints:
+            # The tree is no longer known clean; a crash now must not skip the next check
+            del fingerprints[repo.path]
+            state.forget_clean_fingerprint()
+        # Message generation, commit and push continue in the background
+        pipeline.submit(snapshot)
+        return True
+    
+    def remember_clean_tree(repo, runner):
+        # Persist the directory snapshot of a clean tree so a restart can resume from it
+        state = states.get(repo.path)
+        detector = detectors.get(repo.path)
+        if not state or not detector:
+            return
+        dir_mtimes = detector.dir_mtimes
+        previous = fingerprints.get(repo.path)
+        if dir_mtimes is None or previous is dir_mtimes or previous == dir_mtimes:
+            return
+        head = runner.run("rev-parse", "-q", "--verify", "HEAD")
+        state.save_clean_fingerprint(None if head.startswith("Error") else head, dir_mtimes)
+        fingerprints[repo.path] = dir_mtimes
+    
+    def save_pending(path, pending):
+        if path in states:
+            states[path].set("unpushed_commits", pending)
+    
+    def maintenance_can_run(path):
+        # Neither a commit, a push nor a check of the repository may be in progress
+        return pipeline.is_idle(path) and not any(repo.in_flight for repo in scheduler.repos if repo.path == path)
+    
+    def report_maintenance(path, results):
+        summary = ", ".join(f"{task} {seconds:.1f}s" + ("" if outcome == "ok" else f" ({outcome})")
+                            for task, seconds, outcome in results)
+        print(f"\n🧹 Maintenance for {os.path.basename(path)}: {summary}")
+    
+    scheduler = WatchScheduler(
+        check_repo,
+        check_interval=check_interval,
+        settle_seconds=settle_seconds,
+        max_wait_seconds=max_wait_seconds,
+        workers=workers,
+        min_gap=min_gap,
+        max_interval=max_interval,
+    )
+    pipeline = CommitPipeline(
+        commit_snapshot,
+        push_repo,
+        message_workers=message_workers,
+        on_committed=scheduler.request_check,
+        push_policy=PushPolicy(interval=push_interval, max_commits=push_after_commits),
+        on_pending=save_pending,
+    )
+    
+    detectors = {}
+    runners = {}
+    states = {}  # path -> WatchState when state is persisted
+    fingerprints = {}  # path -> directory snapshot last saved as clean
+    warm_starts = set()  # Event-driven repos whose first check can use the saved fingerprint
+    for watch_path in watch_paths:
+        if untracked_cache or fsmonitor:
+            enable_git_caches(GitRunner(watch_path), untracked_cache, fsmonitor)
+        # In snapshot mode every status, stage and commit goes through the watcher's private index
+        runners[watch_path] = snapshot_runner(GitRunner(watch_path)) if snapshot_mode else GitRunner(watch_path)
+        watcher = create_file_watcher(watch_path, watch_mode)
+        if watcher is None:
+            # Polled repos get tiered detection so idle ticks skip the full status
+            detectors[watch_path] = ChangeDetector(runners[watch_path])
+        repo = RepoWatch(watch_path, watcher)
+        if persist_state:
+            resume_repo_state(repo, runners[watch_path], pipeline, states, detectors, fingerprints, warm_starts)
+        scheduler.add_repo(repo)
+        if maintenance:
+            maintenance.add_repo(watch_path)
+        if watcher:
+            print(f"\nWatching directory: {watch_path} (inotify, {len(watcher.watches)} directories)")
+        else:
+            print(
+                f"\nWatching directory: {watch_path} "
+                f"(checking every {check_interval}-{max(max_interval, check_interval)} seconds, adaptive)"
+            )
+    
+    print(f"\n{len(watch_paths)} repositories, {scheduler.workers} workers, at most one check per repo every {min_gap}s")
+    print(f"Pushing at most every {push_interval}s, or after {push_after_commits} local commits, and on exit")
+    if squash_push:
+        print("Each push is squashed into one commit; micro-commits are kept under refs/auto-commit/")
+    if max_file_mb:
+        action = "tracked with git-lfs" if oversize_action == "lfs" else "left unstaged"
+        print(f"Files over {max_file_mb:g} MB are {action}")
+    if guard.exclude_patterns:
+        print(f"Never committing: {', '.join(guard.exclude_patterns)}")
+    if snapshot_mode:
+        print("Committing through a private index (git plumbing); your own index is left alone")
+    if shard_depth > 0:
+        print(f"Splitting change sets by the first {shard_depth} directory levels (at most {max_shards} commits)")
+    if maintenance:
+        print(
+            f"Maintaining repositories every {maintenance_interval:g} min once idle for {maintenance_idle:g}s "
+            f"(at most {maintenance_budget:g}s per run, low priority)"
+        )
+    if settle_ms > 0:
+        print(f"Committing after {settle_ms} ms of quiet (at most {max_wait_seconds:.0f}s after the first change)")
     print("\n⚠️  Press Ctrl+C to stop watching\n")
     
-    check_count = 0
+    def stop_on_signal(signum, frame):
+        # Service managers stop with SIGTERM; leave run() so the commit/push flush below still happens
+        print(f"\n\n🛑 Received {signal.Signals(signum).name}, stopping auto-commit watch...")
+        print("⏳ Waiting for in-flight checks, commits and pushes to finish...")
+        scheduler.stop()
     
+    maintenance_threads = []
+    if maintenance:
+        maintenance_threads = maintenance.start(scheduler.request_check, scheduler.stop_event, report_maintenance)
+    previous_handler = signal.signal(signal.SIGTERM, stop_on_signal)
     try:
-        while True:
-            check_count += 1
-            current_time = datetime.now().strftime("%H:%M:%S")
-            print(f"[{current_time}] Check #{check_count}: ", end="", flush=True)
-            
-            changed = check_for_changes_and_commit(watch_path)
-            
-            if not changed:
-                # Sleep for the check interval
-                time.sleep(check_interval)
-            else:
-                # If we just committed, wait a bit before next check
-                print(f"\n⏳ Waiting {check_interval} seconds before next check...")
-                time.sleep(check_interval)
-                
+        scheduler.run()
     except KeyboardInterrupt:
         print("\n\n🛑 Stopping auto-commit watch...")
-        print("✅ Auto-commit watch stopped")
+        print("⏳ Waiting for in-flight checks, commits and pushes to finish...")
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+        scheduler.shutdown()
+        for thread in maintenance_threads:
+            # A running task is terminated within half a second of the stop
+            thread.join(timeout=5)
+        pipeline.shutdown()
+        for state in states.values():
+            state.close()
+        counters = pipeline.counters
+        print(
+            f"\n📊 {counters['commits']} commits, {counters['pushes']} pushes "
+            f"({counters['coalesced']} coalesced, {counters['push_failures']} failed)"
+        )
+    print("✅ Auto-commit watch stopped")
+
+
+def resume_repo_state(repo, runner, pipeline, states, detectors, fingerprints, warm_starts):
+    """Open a repository's persisted watcher state and pick up where the last run stopped"""
+    state = open_watch_state(runner)
+    if state is None:
+        return
+    states[repo.path] = state
+    repo.check_count = state.get("check_count", 0)
+    if repo.path not in detectors:
+        # Event-driven repos only need a detector to fingerprint and resume their clean tree
+        detectors[repo.path] = ChangeDetector(runner)
+    
+    resumed = []
+    head = runner.run("rev-parse", "-q", "--verify", "HEAD")
+    dir_mtimes = state.clean_fingerprint(None if head.startswith("Error") else head)
+    if dir_mtimes:
+        # Directory mtimes plus `git diff-index` answer the first check without a full status
+        detectors[repo.path].dir_mtimes = dir_mtimes
+        fingerprints[repo.path] = dir_mtimes
+        if repo.watcher:
+            warm_starts.add(repo.path)
+        resumed.append("clean tree fingerprint")
+    
+    unpushed = state.get("unpushed_commits", 0)
+    if unpushed:
+        # Trust git over the record if commits were pushed or dropped while the watcher was down
+        ahead = runner.run("rev-list", "--count", "@{upstream}..HEAD")
+        if ahead.isdigit():
+            unpushed = min(unpushed, int(ahead))
+        pipeline.restore_pending(repo.path, unpushed)
+        state.set("unpushed_commits", unpushed)
+        if unpushed:
+            resumed.append(f"{unpushed} unpushed commits")
+    if repo.check_count or resumed:
+        details = ", ".join([f"after check #{repo.check_count}"] + resumed)
+        print(f"\n♻️  Resuming {repo.name}: {details}")
+
+
+def load_repo_list(repos_file):
+    """Read repository paths from a file: one per line, blank lines and # comments ignored"""
+    paths = []
+    with open(repos_file, "r") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                paths.append(os.path.expanduser(line))
+    return paths
 
 
 if __name__ == "__main__":
@@ -313,25 +1016,253 @@ if __name__ == "__main__":
     parser.add_argument(
         "--path",
         type=str,
+        nargs="+",
         default=None,
-        help="Path to watch (defaults to current directory)"
+        help="One or more repository paths to watch (defaults to current directory)"
+    )
+    parser.add_argument(
+        "--repos-file",
+        type=str,
+        default=None,
+        help="File listing repository paths to watch, one per line"
     )
     parser.add_argument(
         "--interval",
+        type=float,
+        default=30,
+        help="Check interval in seconds, used again right after activity (default: 30)"
+    )
+    parser.add_argument(
+        "--max-interval",
+        type=float,
+        default=300,
+        help="Idle polled repositories back off exponentially up to this interval (default: 300)"
+    )
+    parser.add_argument(
+        "--watch-mode",
+        choices=["auto", "inotify", "poll"],
+        default="auto",
+        help="How to detect changes: inotify events, periodic polling, or auto (inotify when available)"
+    )
+    parser.add_argument(
+        "--settle-ms",
+        type=int,
+        default=2000,
+        help="Wait until the tree has been quiet this long before committing, 0 to disable (default: 2000)"
+    )
+    parser.add_argument(
+        "--max-wait-ms",
         type=int,
+        default=30000,
+        help="Commit anyway once this long has passed since the first change (default: 30000)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Maximum number of repositories checked concurrently (default: 4)"
+    )
+    parser.add_argument(
+        "--min-gap",
+        type=float,
+        default=5,
+        help="Minimum seconds between two checks of the same repository (default: 5)"
+    )
+    parser.add_argument(
+        "--diff-token-budget",
+        type=int,
+        default=750,
+        help="Approximate tokens of diff to include in the commit-message prompt (default: 750)"
+    )
+    parser.add_argument(
+        "--message-workers",
+        type=int,
+        default=2,
+        help="Background workers generating commit messages and committing (default: 2)"
+    )
+    parser.add_argument(
+        "--push-interval",
+        type=float,
         default=30,
-        help="Check interval in seconds (default: 30)"
+        help="Push each repository at most every N seconds, 0 to push after every commit (default: 30)"
+    )
+    parser.add_argument(
+        "--push-after-commits",
+        type=int,
+        default=10,
+        help="Push as soon as this many local commits are waiting, regardless of the interval (default: 10)"
+    )
+    parser.add_argument(
+        "--untracked-files",
+        choices=["all", "normal", "no"],
+        default="normal",
+        help="How git status looks for untracked files (default: normal)"
+    )
+    parser.add_argument(
+        "--untracked-cache",
+        action="store_true",
+        help="Enable git's untracked cache in watched repositories"
+    )
+    parser.add_argument(
+        "--fsmonitor",
+        nargs="?",
+        const=True,
+        default=False,
+        metavar="HOOK",
+        help="Enable git's built-in fsmonitor daemon in watched repositories (macOS/Windows), "
+             "or the given fsmonitor hook, e.g. Watchman's, on any platform"
+    )
+    parser.add_argument(
+        "--message-mode",
+        choices=["auto", "llm", "heuristic"],
+        default="auto",
+        help="Commit messages from the LLM, the local heuristic, or auto (heuristic for trivial changes)"
+    )
+    parser.add_argument(
+        "--max-file-mb",
+        type=float,
+        default=10,
+        help="Never stage files larger than this many MB, 0 to disable (default: 10)"
+    )
+    parser.add_argument(
+        "--exclude",
+        type=str,
+        action="append",
+        default=None,
+        help="Glob (path or file name) that is never auto-committed; repeatable"
+    )
+    parser.add_argument(
+        "--oversize-action",
+        choices=["skip", "lfs"],
+        default="skip",
+        help="What to do with files over --max-file-mb: leave them unstaged, or track them with git-lfs"
+    )
+    parser.add_argument(
+        "--shard-depth",
+        type=int,
+        default=0,
+        help="Split each change set into one commit per directory, this many levels deep; 0 disables (default: 0)"
+    )
+    parser.add_argument(
+        "--max-shards",
+        type=int,
+        default=8,
+        help="At most this many commits per change set when sharding; smaller groups are merged (default: 8)"
+    )
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="Commit through a private index with update-index/write-tree/commit-tree instead of git add/commit"
+    )
+    parser.add_argument(
+        "--squash-push",
+        action="store_true",
+        help="Push one squashed commit per push window instead of every auto-commit "
+             "(the micro-commits stay local under refs/auto-commit/)"
+    )
+    parser.add_argument(
+        "--no-state",
+        action="store_true",
+        help="Do not persist watcher state (check count, clean-tree fingerprint, unpushed commits, "
+             "pending messages) in each repository's git directory"
+    )
+    parser.add_argument(
+        "--maintenance-interval",
+        type=float,
+        default=60,
+        help="Pack loose objects and update the commit-graph and multi-pack-index of idle repos "
+             "at most this often, in minutes; 0 disables (default: 60)"
+    )
+    parser.add_argument(
+        "--maintenance-idle",
+        type=float,
+        default=120,
+        help="Only run maintenance after a repository has had no changes for this many seconds (default: 120)"
+    )
+    parser.add_argument(
+        "--maintenance-budget",
+        type=float,
+        default=60,
+        help="Seconds of maintenance per repository per run; unfinished tasks resume next time (default: 60)"
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print repository details as one JSON record per line (NDJSON) instead of text"
+    )
+    parser.add_argument(
+        "--cache-max-age",
+        type=float,
+        default=60,
+        help="With --json, reuse a cached record while HEAD, the index and refs are unchanged and it is "
+             "at most this many seconds old, so working-tree edits show up eventually; "
+             "0 means no age limit, -1 disables the cache (default: 60)"
+    )
+    parser.add_argument(
+        "--metrics-log",
+        type=str,
+        default=None,
+        help="Append a JSON line per timed phase to this file ('-' for stderr)"
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=str,
+        default=None,
+        help="Write phase duration, diff size and LLM token histograms to this Prometheus textfile"
     )
     
     args = parser.parse_args()
+    metrics.configure(args.metrics_log, args.metrics_file)
     
     try:
         if args.watch:
-            watch_path = args.path or os.path.dirname(os.path.abspath(__file__))
-            watch_path = os.path.abspath(watch_path)
-            start_auto_commit_watch(watch_path, args.interval)
+            watch_paths = list(args.path or [])
+            if args.repos_file:
+                watch_paths.extend(load_repo_list(args.repos_file))
+            if not watch_paths:
+                watch_paths = [os.path.dirname(os.path.abspath(__file__))]
+            # De-duplicate while keeping the order given on the command line
+            watch_paths = list(dict.fromkeys(os.path.abspath(path) for path in watch_paths))
+            start_auto_commit_watch(
+                watch_paths,
+                check_interval=args.interval,
+                watch_mode=args.watch_mode,
+                settle_ms=args.settle_ms,
+                max_wait_ms=args.max_wait_ms,
+                workers=args.workers,
+                min_gap=args.min_gap,
+                diff_token_budget=args.diff_token_budget,
+                message_workers=args.message_workers,
+                push_interval=args.push_interval,
+                push_after_commits=args.push_after_commits,
+                untracked_files=args.untracked_files,
+                untracked_cache=args.untracked_cache,
+                fsmonitor=args.fsmonitor,
+                max_interval=args.max_interval,
+                message_mode=args.message_mode,
+                max_file_mb=args.max_file_mb,
+                exclude_patterns=args.exclude,
+                oversize_action=args.oversize_action,
+                shard_depth=args.shard_depth,
+                max_shards=args.max_shards,
+                snapshot_mode=args.snapshot,
+                maintenance_interval=args.maintenance_interval,
+                maintenance_idle=args.maintenance_idle,
+                maintenance_budget=args.maintenance_budget,
+                squash_push=args.squash_push,
+                persist_state=not args.no_state
+            )
         else:
-            get_git_details()
+            repo_paths = list(args.path or [])
+            if args.repos_file:
+                repo_paths.extend(load_repo_list(args.repos_file))
+            if args.json:
+                print_git_details_json(repo_paths, args.cache_max_age)
+            else:
+                for repo_path in repo_paths or [None]:
+                    get_git_details(repo_path)
     except Exception as e:
         print(f"An error occurred: {e}")
         sys.exit(1)
+    finally:
+        metrics.close()
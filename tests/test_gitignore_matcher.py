@@ -0,0 +1,40 @@
+from utils.file_watcher import GitIgnoreMatcher
+
+
+def make_repo(tmp_path, gitignore, excludes=None):
+    (tmp_path / ".git" / "info").mkdir(parents=True)
+    (tmp_path / ".gitignore").write_text(gitignore)
+    excludes_file = None
+    if excludes is not None:
+        excludes_file = tmp_path / "global-ignore"
+        excludes_file.write_text(excludes)
+    return tmp_path, excludes_file
+
+
+def test_tracked_file_keeps_its_ignored_directories_watched(tmp_path):
+    root, _ = make_repo(tmp_path, "build/\n")
+    matcher = GitIgnoreMatcher(root, always_include=["build/out/keep.txt"])
+
+    assert not matcher.is_ignored("build", is_dir=True)
+    assert not matcher.is_ignored("build/out", is_dir=True)
+    assert not matcher.is_ignored("build/out/keep.txt")
+    # Everything else below the ignored directory stays ignored
+    assert matcher.is_ignored("build/junk.o")
+    assert matcher.is_ignored("build/out/junk.o")
+    assert matcher.is_ignored("build/tmp", is_dir=True)
+
+
+def test_ignored_directory_without_tracked_files_stays_ignored(tmp_path):
+    root, _ = make_repo(tmp_path, "build/\n")
+    matcher = GitIgnoreMatcher(root)
+
+    assert matcher.is_ignored("build", is_dir=True)
+    assert not matcher.is_ignored("src", is_dir=True)
+
+
+def test_global_excludes_file_is_applied(tmp_path):
+    root, excludes_file = make_repo(tmp_path, "", excludes="*.swp\n")
+    matcher = GitIgnoreMatcher(root, excludes_file=str(excludes_file))
+
+    assert matcher.is_ignored("src/.main.py.swp")
+    assert not matcher.is_ignored("src/main.py")
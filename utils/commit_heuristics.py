@@ -0,0 +1,170 @@
+"""
+Local, zero-network conventional-commit messages
+Messages are built from the staged name-status and numstat, a classification of
+each path (docs, tests, config, CI, lockfiles, assets, source) and the symbol
+names added or removed in the diff summary's hunks. Trivial changesets (lockfile-
+or docs-only, pure renames or deletions, assets) never need the LLM
+"""
+
+import os
+import re
+
+MAX_SUBJECT = 50
+
+LOCKFILES = {
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "npm-shrinkwrap.json", "bun.lockb",
+    "poetry.lock", "pipfile.lock", "uv.lock", "pdm.lock", "cargo.lock", "go.sum",
+    "gemfile.lock", "composer.lock", "podfile.lock", "pubspec.lock", "mix.lock", "flake.lock",
+}
+DOC_EXTENSIONS = {".md", ".rst", ".txt", ".adoc"}
+DOC_NAMES = {"readme", "changelog", "license", "contributing", "authors", "notice", "copying"}
+CONFIG_EXTENSIONS = {".toml", ".ini", ".cfg", ".conf", ".yaml", ".yml", ".json", ".env"}
+CONFIG_NAMES = {
+    ".gitignore", ".gitattributes", ".editorconfig", ".env.example", "dockerfile", "makefile",
+    "requirements.txt", "setup.py", "setup.cfg", "pyproject.toml", "package.json", "tsconfig.json",
+}
+ASSET_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".webp", ".pdf", ".woff", ".woff2", ".ttf",
+    ".mp3", ".mp4", ".wav", ".zip", ".gz",
+}
+
+TRIVIAL_CATEGORIES = {"lockfile", "docs", "asset"}
+
+SYMBOL = re.compile(
+    r"^([+-])\s*(?:export\s+)?(?:default\s+)?(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?"
+    r"(?:def|class|function|func|fn|interface|struct|enum|type|trait)\s+(?:\([^)]*\)\s*)?\*?([A-Za-z_]\w*)"
+)
+
+
+def classify_path(path):
+    """Return the category of a path: lockfile, docs, test, ci, config, asset or source"""
+    lower = path.lower()
+    name = os.path.basename(lower)
+    stem, ext = os.path.splitext(name)
+    parts = lower.split("/")
+
+    if name in LOCKFILES:
+        return "lockfile"
+    if lower.startswith((".github/workflows/", ".gitlab-ci", ".circleci/")) or name == "jenkinsfile":
+        return "ci"
+    if (
+        any(part in ("test", "tests", "__tests__", "spec") for part in parts[:-1])
+        or stem.startswith("test_") or stem.endswith(("_test", ".test", ".spec"))
+    ):
+        return "test"
+    if (ext in DOC_EXTENSIONS and name not in CONFIG_NAMES) or stem in DOC_NAMES or parts[0] in ("docs", "doc"):
+        return "docs"
+    if name in CONFIG_NAMES or ext in CONFIG_EXTENSIONS or name.startswith(".env"):
+        return "config"
+    if ext in ASSET_EXTENSIONS:
+        return "asset"
+    return "source"
+
+
+def categorize(entries, numstat=None):
+    """Map each changed path to its category; binary files per numstat count as assets"""
+    binary = {entry[2] for entry in numstat or [] if entry[3]}
+    categories = {}
+    for entry in entries:
+        category = classify_path(entry["path"])
+        if category == "source" and entry["path"] in binary:
+            category = "asset"
+        categories[entry["path"]] = category
+    return categories
+
+
+def changed_symbols(diff_summary):
+    """Return (added, removed) definition names found in the summary's hunks"""
+    added, removed = [], []
+    for line in (diff_summary or "").splitlines():
+        match = SYMBOL.match(line)
+        if match:
+            (added if match.group(1) == "+" else removed).append(match.group(2))
+    # A definition that is both removed and re-added was only edited
+    both = set(added) & set(removed)
+    added = list(dict.fromkeys(name for name in added if name not in both))
+    removed = list(dict.fromkeys(name for name in removed if name not in both))
+    return added, removed
+
+
+def describe_paths(paths):
+    """Short human description of a set of paths"""
+    if len(paths) == 1:
+        return os.path.basename(paths[0])
+    directories = {os.path.dirname(path) for path in paths}
+    if len(directories) == 1 and next(iter(directories)):
+        return os.path.basename(next(iter(directories)))
+    return f"{len(paths)} files"
+
+
+def join_names(names, budget):
+    """Join names with commas while they fit in budget characters"""
+    text = ""
+    for index, name in enumerate(names):
+        candidate = f"{text}, {name}" if text else name
+        if len(candidate) > budget:
+            if not text:
+                return name[:budget]
+            return f"{text} and {len(names) - index} more" if len(text) + 12 <= budget else text
+        text = candidate
+    return text
+
+
+def verb_for(entries):
+    """Pick add/remove/rename/move/update from the name-status letters"""
+    statuses = {entry["status"] for entry in entries}
+    if statuses == {"A"}:
+        return "add"
+    if statuses == {"D"}:
+        return "remove"
+    if statuses == {"R"}:
+        return "move" if len(entries) > 1 else "rename"
+    return "update"
+
+
+def is_trivial_change(entries, numstat=None):
+    """True when a changeset is not worth an LLM call: lockfiles/docs/assets only, or pure renames/deletes"""
+    if not entries:
+        return True
+    if set(categorize(entries, numstat).values()) <= TRIVIAL_CATEGORIES:
+        return True
+    return all(entry["status"] in "RD" for entry in entries)
+
+
+def generate_heuristic_message(entries, numstat=None, diff_summary=""):
+    """Build a conventional-commit subject (e.g. "docs: update readme.md") without any network call"""
+    if not entries:
+        return "chore: update files"
+    paths = [entry["path"] for entry in entries]
+    path_categories = categorize(entries, numstat)
+    categories = set(path_categories.values())
+    verb = verb_for(entries)
+
+    if categories == {"lockfile"}:
+        commit_type, target = "chore", describe_paths(paths) if len(paths) == 1 else "dependency lockfiles"
+    elif categories <= {"docs"}:
+        commit_type, target = "docs", describe_paths(paths)
+    elif categories <= {"test"}:
+        commit_type, target = "test", describe_paths(paths)
+    elif categories <= {"ci"}:
+        commit_type, target = "ci", describe_paths(paths)
+    elif categories <= {"config", "lockfile", "asset"}:
+        commit_type, target = "chore", describe_paths(paths)
+    else:
+        source_paths = [path for path in paths if path_categories[path] == "source"] or paths
+        added, removed = changed_symbols(diff_summary)
+        budget = MAX_SUBJECT - len("feat: add ")
+        if verb in ("rename", "move"):
+            commit_type, target = "refactor", describe_paths(source_paths)
+        elif added:
+            commit_type, verb, target = "feat", "add", join_names(added, budget)
+        elif removed:
+            commit_type, verb, target = "refactor", "remove", join_names(removed, budget)
+        elif verb == "add":
+            commit_type, target = "feat", describe_paths(source_paths)
+        elif verb == "remove":
+            commit_type, target = "refactor", describe_paths(source_paths)
+        else:
+            commit_type, target = "chore", describe_paths(source_paths)
+
+    return f"{commit_type}: {verb} {target}"[:MAX_SUBJECT].rstrip()
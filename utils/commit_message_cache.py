@@ -0,0 +1,182 @@
+"""
+Content-addressed on-disk cache for LLM-generated commit messages
+Entries are keyed by a hash of the changed file list and the normalized diff,
+expire after a TTL and are evicted least-recently-used once the cache grows
+past its size limit
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "ai-pr-devops",
+    "commit-messages",
+)
+
+CACHE_DIR = os.getenv("COMMIT_MESSAGE_CACHE_DIR", DEFAULT_CACHE_DIR)
+CACHE_MAX_BYTES = int(os.getenv("COMMIT_MESSAGE_CACHE_MAX_BYTES", str(5 * 1024 * 1024)))
+CACHE_TTL_SECONDS = int(os.getenv("COMMIT_MESSAGE_CACHE_TTL", str(30 * 24 * 3600)))
+
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+
+def normalize_diff(diff_content):
+    """Strip parts of a diff that change without the change itself changing"""
+    lines = []
+    for line in diff_content.splitlines():
+        # Abbreviated blob ids vary in length between repositories
+        if line.startswith("index "):
+            continue
+        # The same patch applied at a different offset is still the same change
+        line = HUNK_HEADER.sub("@@", line)
+        lines.append(line.rstrip())
+    return "\n".join(lines)
+
+
+def cache_key(changed_files, diff_content):
+    """Return the content address for a set of changed files and their diff"""
+    digest = hashlib.sha256()
+    for path in sorted(changed_files):
+        digest.update(path.encode("utf-8", "surrogateescape") + b"\0")
+    digest.update(b"\0")
+    digest.update(normalize_diff(diff_content).encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()
+
+
+class CommitMessageCache:
+    """Size-bounded LRU cache of commit messages stored as one small JSON file per entry"""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, ttl_seconds=CACHE_TTL_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self._size = None  # Total bytes on disk, computed lazily
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Return the cached message for key, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        path = self._entry_path(key)
+        with self.lock:
+            try:
+                with open(path, "r") as entry_file:
+                    entry = json.load(entry_file)
+            except (OSError, ValueError):
+                self.misses += 1
+                return None
+
+            if time.time() - entry.get("created", 0) > self.ttl_seconds:
+                self._remove(path)
+                self.misses += 1
+                return None
+
+            # mtime doubles as the last-used timestamp for LRU eviction
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self.hits += 1
+            return entry.get("message")
+
+    def put(self, key, message):
+        """Store message under key and evict old entries if over the size limit"""
+        if not self.enabled:
+            return
+
+        path = self._entry_path(key)
+        data = json.dumps({"message": message, "created": time.time()})
+        with self.lock:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                previous = os.path.getsize(path) if os.path.exists(path) else 0
+                # Write to a temp file and rename so readers never see a partial entry
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+                with os.fdopen(fd, "w") as tmp_file:
+                    tmp_file.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"⚠️  Could not write commit message cache entry: {e}")
+                return
+
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        if self._size is not None:
+            self._size -= size
+
+    def _entries(self):
+        """Yield (mtime, size, path) for every entry on disk"""
+        try:
+            shards = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for shard in shards:
+            shard_dir = os.path.join(self.cache_dir, shard)
+            try:
+                names = os.listdir(shard_dir)
+            except OSError:
+                continue
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(shard_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Drop expired entries, then least-recently-used ones, until under 90% of the limit"""
+        entries = sorted(self._entries())
+        now = time.time()
+        target = self.max_bytes * 0.9
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in entries:
+            if total <= target and now - mtime <= self.ttl_seconds:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._size = total
+
+    def stats(self):
+        """Return hit/miss/eviction counters"""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,226 @@
+"""
+Asynchronous commit/push pipeline for the auto-commit watcher
+Detection hands staged snapshots to message/commit workers, and commits hand
+their repository to a push worker that pushes on a time or commit budget (and on
+shutdown), coalescing consecutive commits into one push and retrying failures
+with backoff, so the watch loop never waits on the LLM or the remote
+"""
+
+import queue
+import random
+import threading
+import time
+
+
+class PushPolicy:
+    """When to push: at most every interval seconds, after max_commits commits, or on shutdown"""
+
+    def __init__(self, interval=30, max_commits=10, retry_base=5, retry_cap=300):
+        self.interval = interval
+        self.max_commits = max(1, max_commits)
+        self.retry_base = retry_base
+        self.retry_cap = retry_cap
+
+    def due_at(self, state):
+        """Monotonic time at which the pending commits in state should be pushed"""
+        if state.retry_at is not None:
+            return state.retry_at
+        if state.pending >= self.max_commits:
+            return 0.0
+        return state.last_push + self.interval
+
+    def retry_delay(self, failures):
+        """Full-jitter exponential backoff after a failed push"""
+        return random.uniform(self.retry_base / 2, min(self.retry_cap, self.retry_base * (2 ** (failures - 1))))
+
+
+class PushState:
+    """Unpushed commits and push history for one repository"""
+
+    def __init__(self):
+        self.pending = 0
+        self.last_push = time.monotonic()
+        self.failures = 0
+        self.retry_at = None
+
+
+class CommitPipeline:
+    """Detection -> message generation + local commit -> push, each stage on its own workers"""
+
+    def __init__(self, commit_fn, push_fn, message_workers=2, on_committed=None, push_policy=None,
+                 on_pending=None):
+        self.commit_fn = commit_fn  # commit_fn(snapshot) -> True (or the number of commits) if anything was committed
+        self.push_fn = push_fn  # push_fn(path, commit_count) -> True if the push succeeded
+        self.on_committed = on_committed
+        self.on_pending = on_pending  # on_pending(path, unpushed_count) whenever the unpushed count changes
+        self.push_policy = push_policy or PushPolicy()
+        self.commit_queue = queue.Queue()
+        self.push_states = {}  # path -> PushState
+        self.push_cond = threading.Condition()
+        self.busy = set()  # Repositories with a snapshot waiting for its commit
+        self.busy_lock = threading.Lock()
+        self.stopping = False
+        self.shutdown_deadline = None
+        self.counters = {"commits": 0, "pushes": 0, "coalesced": 0, "push_failures": 0}
+        self.pushing = 0
+        self.push_path = None  # Repository the push worker is pushing right now
+
+        self.commit_threads = [
+            threading.Thread(target=self._commit_worker, name=f"commit-{i}", daemon=True)
+            for i in range(max(1, message_workers))
+        ]
+        self.push_thread = threading.Thread(target=self._push_worker, name="push", daemon=True)
+        for thread in self.commit_threads:
+            thread.start()
+        self.push_thread.start()
+
+    def submit(self, snapshot):
+        """Queue a staged snapshot (a dict with at least "path") for commit"""
+        with self.busy_lock:
+            self.busy.add(snapshot["path"])
+        self.commit_queue.put(snapshot)
+
+    def restore_pending(self, path, count):
+        """Seed unpushed commits left over from a previous run; they are pushed right away"""
+        if count <= 0:
+            return
+        with self.push_cond:
+            state = self.push_states.setdefault(path, PushState())
+            state.pending += count
+            state.last_push = time.monotonic() - self.push_policy.interval
+            self.push_cond.notify()
+
+    def _report_pending(self, path, pending):
+        if self.on_pending:
+            try:
+                self.on_pending(path, pending)
+            except Exception as e:
+                print(f"\n⚠️  Could not record unpushed commits for {path}: {e}")
+
+    def is_busy(self, path):
+        """True while a snapshot of path is waiting for its message and commit"""
+        with self.busy_lock:
+            return path in self.busy
+
+    def is_idle(self, path):
+        """True when path has no snapshot waiting to be committed and is not being pushed"""
+        with self.push_cond:
+            if self.push_path == path:
+                return False
+        return not self.is_busy(path)
+
+    def depths(self):
+        """Current per-stage queue depths"""
+        with self.push_cond:
+            push_depth = sum(state.pending for state in self.push_states.values())
+            pushing = self.pushing
+        with self.busy_lock:
+            busy = len(self.busy)
+        waiting = self.commit_queue.qsize()
+        return {
+            "commit": waiting,
+            "committing": max(busy - waiting, 0),
+            "push": push_depth,
+            "pushing": pushing,
+        }
+
+    def _commit_worker(self):
+        while True:
+            snapshot = self.commit_queue.get()
+            if snapshot is None:
+                break
+            path = snapshot["path"]
+            committed = False
+            try:
+                committed = self.commit_fn(snapshot)
+            except Exception as e:
+                print(f"\n❌ Error while committing {path}: {e}")
+            finally:
+                with self.busy_lock:
+                    self.busy.discard(path)
+
+            if committed:
+                with self.push_cond:
+                    self.counters["commits"] += int(committed)
+                    state = self.push_states.setdefault(path, PushState())
+                    state.pending += int(committed)
+                    pending = state.pending
+                    self.push_cond.notify()
+                self._report_pending(path, pending)
+            if self.on_committed:
+                # Changes made while the message was being generated still need a look
+                self.on_committed(path)
+
+    def _next_push(self):
+        """Return (path, due_at) of the repository whose push is due soonest, or (None, None)"""
+        best_path, best_due = None, None
+        for path, state in self.push_states.items():
+            if not state.pending:
+                continue
+            # On shutdown everything goes out now, except pushes that just failed and are backing off
+            due = 0.0 if self.stopping and state.retry_at is None else self.push_policy.due_at(state)
+            if best_due is None or due < best_due:
+                best_path, best_due = path, due
+        return best_path, best_due
+
+    def _push_worker(self):
+        while True:
+            with self.push_cond:
+                while True:
+                    path, due = self._next_push()
+                    now = time.monotonic()
+                    if path is not None and due <= now:
+                        break
+                    if self.stopping and (path is None or self.shutdown_deadline <= now):
+                        for unpushed_path, state in self.push_states.items():
+                            if state.pending:
+                                print(f"\n⚠️  {state.pending} commits in {unpushed_path} were not pushed")
+                        return
+                    timeout = None if path is None else due - now
+                    if self.stopping:
+                        timeout = min(timeout, self.shutdown_deadline - now)
+                    self.push_cond.wait(timeout)
+                # Every commit queued for this repo so far goes out in a single push
+                state = self.push_states[path]
+                commit_count = state.pending
+                self.pushing += 1
+                self.push_path = path
+
+            ok = False
+            try:
+                ok = self.push_fn(path, commit_count)
+            except Exception as e:
+                print(f"\n❌ Error while pushing {path}: {e}")
+
+            with self.push_cond:
+                self.pushing -= 1
+                self.push_path = None
+                if ok:
+                    # Commits made while the push ran stay pending for the next one
+                    state.pending -= commit_count
+                    state.last_push = time.monotonic()
+                    state.failures = 0
+                    state.retry_at = None
+                    self.counters["pushes"] += 1
+                    self.counters["coalesced"] += commit_count - 1
+                    pending = state.pending
+                else:
+                    state.failures += 1
+                    delay = self.push_policy.retry_delay(state.failures)
+                    state.retry_at = time.monotonic() + delay
+                    self.counters["push_failures"] += 1
+                    print(f"\n⏳ Retrying push of {path} in {delay:.0f}s (attempt {state.failures + 1})")
+            if ok:
+                self._report_pending(path, pending)
+
+    def shutdown(self, push_timeout=60):
+        """Finish queued commits, push whatever is pending (retrying for up to push_timeout), then stop"""
+        for _ in self.commit_threads:
+            self.commit_queue.put(None)
+        for thread in self.commit_threads:
+            thread.join()
+        with self.push_cond:
+            self.stopping = True
+            self.shutdown_deadline = time.monotonic() + push_timeout
+            self.push_cond.notify_all()
+        self.push_thread.join()
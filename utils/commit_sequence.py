@@ -0,0 +1,82 @@
+"""
+Persisted per-repository commit sequence for the NNN- commit message prefix
+The number of commits up to the last auto-commit is stored next to the repository's
+git data, so numbering the next commit does not walk the history with
+`git rev-list --count HEAD`. If HEAD moved in the meantime (manual commits,
+rebases, resets) the counter is reconciled lazily on the next commit
+"""
+
+import os
+import tempfile
+
+SEQUENCE_FILE = "auto-commit-sequence"
+
+
+def _read_state(path):
+    """Return (count, head) from the sequence file, or (None, None)"""
+    try:
+        with open(path, "r") as state_file:
+            count, head = state_file.read().split()
+        return int(count), head
+    except (OSError, ValueError):
+        return None, None
+
+
+def _write_state(path, count, head):
+    """Atomically replace the sequence file"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{SEQUENCE_FILE}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as tmp_file:
+            tmp_file.write(f"{count} {head}\n")
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _git_dir_and_head(runner):
+    """Return (absolute git dir, HEAD sha or None) from a single rev-parse call"""
+    result = runner.run_process("rev-parse", "--absolute-git-dir", "--verify", "-q", "HEAD")
+    lines = result.stdout.split()
+    git_dir = lines[0] if lines else None
+    head = lines[1] if len(lines) > 1 else None
+    return git_dir, head
+
+
+def next_commit_number(runner):
+    """Return the number the next commit on HEAD will have (commits in history + 1)"""
+    git_dir, head = _git_dir_and_head(runner)
+    if head is None:
+        return 1  # Unborn branch
+    if git_dir is None:
+        return 1
+
+    count, recorded_head = _read_state(os.path.join(git_dir, SEQUENCE_FILE))
+    if count is not None and recorded_head == head:
+        return count + 1
+
+    if count is not None and recorded_head:
+        # Someone committed on top of our last auto-commit: only count the new commits
+        is_ancestor = runner.run_process("merge-base", "--is-ancestor", recorded_head, head)
+        if is_ancestor.returncode == 0:
+            new_commits = runner.run("rev-list", "--count", f"{recorded_head}..{head}")
+            if new_commits.isdigit():
+                return count + int(new_commits) + 1
+
+    # No state yet, or history was rewritten: fall back to a full count once
+    total = runner.run("rev-list", "--count", "HEAD")
+    return int(total) + 1 if total.isdigit() else 1
+
+
+def record_commit_number(runner, number):
+    """Remember that HEAD is now commit number `number`"""
+    git_dir, head = _git_dir_and_head(runner)
+    if git_dir is None or head is None:
+        return
+    try:
+        _write_state(os.path.join(git_dir, SEQUENCE_FILE), number, head)
+    except OSError as e:
+        print(f"⚠️  Could not persist commit sequence: {e}")
@@ -0,0 +1,58 @@
+"""
+Split one staged change set into several logical commits by directory
+Each shard is a group of staged paths under the same leading directories; shards
+get their own message and are committed in sequence from a private index, so a
+large change set lands as reviewable history
+"""
+
+from collections import OrderedDict
+
+from utils.temp_index import ZERO_OID
+
+
+def shard_key(path, depth):
+    """Leading `depth` directories of path ("" for files above that depth)"""
+    parts = path.split("/")[:-1]
+    return "/".join(parts[:depth])
+
+
+def partition_changes(entries, depth=1, max_shards=8):
+    """Group name-status entries into [(key, entries)], merging the smallest groups past max_shards"""
+    groups = OrderedDict()
+    for entry in sorted(entries, key=lambda entry: entry["path"]):
+        groups.setdefault(shard_key(entry["path"], depth), []).append(entry)
+
+    shards = list(groups.items())
+    if max_shards and len(shards) > max_shards:
+        # Keep the largest groups as their own commits and fold the long tail into one
+        ranked = sorted(shards, key=lambda shard: len(shard[1]), reverse=True)
+        kept = {key for key, _entries in ranked[:max_shards - 1]}
+        rest = [entry for key, shard_entries in shards if key not in kept for entry in shard_entries]
+        shards = [(key, shard_entries) for key, shard_entries in shards if key in kept]
+        shards.append(("other", rest))
+    return shards
+
+
+def index_info_lines(staged_index, entries):
+    """--index-info lines that copy a shard's entries from the staged index (or delete them)"""
+    lines = []
+    for entry in entries:
+        if entry["orig_path"] and entry["status"] == "R":
+            lines.append(f"0 {ZERO_OID}\t{entry['orig_path']}")
+        staged = staged_index.get(entry["path"])
+        if staged:
+            lines.append(f"{staged}\t{entry['path']}")
+        else:
+            lines.append(f"0 {ZERO_OID}\t{entry['path']}")
+    return lines
+
+
+def parse_ls_files_stage(output):
+    """Parse `git ls-files -s -z` into {path: "mode sha stage"}"""
+    staged = {}
+    for record in output.split("\0"):
+        if not record:
+            continue
+        info, _, path = record.partition("\t")
+        staged[path] = info
+    return staged
@@ -0,0 +1,105 @@
+"""
+Stat-validated cache for machine-readable repository details
+A repository's details record is stored next to its git data together with the
+stat signature of HEAD, the index, the config, packed-refs and every loose-ref
+directory. A poll re-stats those paths and, if nothing moved, returns the stored
+record without running git at all
+"""
+
+import json
+import os
+import tempfile
+import time
+
+CACHE_FILE = "auto-commit-details.json"
+
+
+def find_git_dirs(path):
+    """Return (git dir, common dir) for the repository containing path, or None; spawns no git"""
+    path = os.path.abspath(path)
+    while True:
+        dot_git = os.path.join(path, ".git")
+        if os.path.isdir(dot_git):
+            git_dir = dot_git
+            break
+        if os.path.isfile(dot_git):
+            # Linked worktrees and submodules: ".git" is a "gitdir: <path>" file
+            try:
+                with open(dot_git, "r") as dot_git_file:
+                    line = dot_git_file.readline().strip()
+            except OSError:
+                return None
+            if not line.startswith("gitdir:"):
+                return None
+            git_dir = os.path.normpath(os.path.join(path, line[len("gitdir:"):].strip()))
+            break
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+    common_dir = git_dir
+    try:
+        with open(os.path.join(git_dir, "commondir"), "r") as commondir_file:
+            common_dir = os.path.normpath(os.path.join(git_dir, commondir_file.read().strip()))
+    except OSError:
+        pass
+    return git_dir, common_dir
+
+
+def _stat_entry(path):
+    try:
+        stat = os.stat(path)
+        return [path, stat.st_mtime_ns, stat.st_size, stat.st_ino]
+    except OSError:
+        return [path, None, None, None]
+
+
+def stat_signature(git_dir, common_dir):
+    """Stat data of everything the details record is derived from"""
+    signature = [_stat_entry(os.path.join(git_dir, name)) for name in ("HEAD", "index")]
+    signature += [_stat_entry(os.path.join(common_dir, name)) for name in ("config", "packed-refs")]
+    # Ref updates are written with lock-and-rename, so the containing directory's mtime moves
+    stack = [os.path.join(common_dir, "refs")]
+    while stack:
+        directory = stack.pop()
+        signature.append(_stat_entry(directory))
+        try:
+            with os.scandir(directory) as entries:
+                stack.extend(entry.path for entry in entries if entry.is_dir(follow_symlinks=False))
+        except OSError:
+            pass
+    signature.sort(key=lambda entry: entry[0])
+    return signature
+
+
+def load_cached_details(git_dir, signature, max_age):
+    """Return the cached record if the signature matches and it is at most max_age seconds old"""
+    try:
+        with open(os.path.join(git_dir, CACHE_FILE), "r") as cache_file:
+            cached = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+    if cached.get("signature") != signature:
+        return None
+    if max_age and time.time() - cached.get("generated_at", 0) > max_age:
+        return None
+    return cached.get("record")
+
+
+def store_cached_details(git_dir, signature, record):
+    """Atomically replace the cached record; failures only cost the next poll a refresh"""
+    payload = {"signature": signature, "generated_at": time.time(), "record": record}
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=git_dir, prefix=f"{CACHE_FILE}.", suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "w") as tmp_file:
+            json.dump(payload, tmp_file)
+        os.replace(tmp_path, os.path.join(git_dir, CACHE_FILE))
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
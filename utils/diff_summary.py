@@ -0,0 +1,241 @@
+"""
+Token-budgeted summary of the staged diff for the commit-message prompt
+Files are ranked from `git diff --numstat`, the diff of the top-ranked files is
+read incrementally with a hard memory cap, and the most informative hunks of
+each file are picked round-robin until the token budget is spent
+"""
+
+import heapq
+import re
+
+CHARS_PER_TOKEN = 4
+MAX_FILES = 25  # Files whose hunks we read at all
+MAX_HUNKS_PER_FILE = 4
+MAX_HUNK_LINES = 40
+MAX_READ_BYTES = 8 * 1024 * 1024  # Stop reading git output after this much
+MAX_LINE_BYTES = 4096  # Longer lines (minified or generated files) are cut here
+
+BINARY_STAT = re.compile(r"^\s*(.+?)\s+\| Bin (\d+) -> (\d+) bytes$")
+DEFINITION = re.compile(r"^[+-]\s*(?:async\s+)?(?:def|class|function|func|fn|interface|struct|enum|type|export)\b")
+
+
+def parse_numstat(output):
+    """Parse `git diff --numstat -z` output into (added, deleted, path, is_binary, orig_path) tuples"""
+    files = []
+    records = output.split("\0")
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if not record:
+            continue
+        added, deleted, path = (record.split("\t", 2) + ["", ""])[:3]
+        orig_path = None
+        if not path:
+            # Renames: the old and new paths follow as separate records
+            orig_path = records[i] if i < len(records) else ""
+            path = records[i + 1] if i + 1 < len(records) else ""
+            i += 2
+        is_binary = added == "-"
+        files.append((
+            0 if is_binary else int(added),
+            0 if is_binary else int(deleted),
+            path,
+            is_binary,
+            orig_path,
+        ))
+    return files
+
+
+def rank_files(numstat):
+    """Order files so the most informative text changes come first"""
+    def score(entry):
+        added, deleted, _path, is_binary, _orig_path = entry
+        if is_binary:
+            return -1
+        # Cap churn so one huge generated file cannot crowd out everything else
+        return min(added + deleted, 400)
+    return sorted(numstat, key=score, reverse=True)
+
+
+def binary_sizes(runner, paths):
+    """Old and new sizes of staged binary files from `git diff --stat`; returns {path: (old, new)}"""
+    output = runner.run("diff", "--cached", "--stat=10000", "--stat-name-width=10000", "--", *paths)
+    sizes = {}
+    for line in output.splitlines():
+        match = BINARY_STAT.match(line)
+        if match:
+            sizes[match.group(1)] = (int(match.group(2)), int(match.group(3)))
+    return sizes
+
+
+def score_hunk(lines, changed):
+    """Prefer hunks that touch definitions and are dense with changes"""
+    definitions = sum(1 for line in lines if DEFINITION.match(line))
+    density = changed / max(len(lines), 1)
+    return definitions * 5 + changed * density
+
+
+def read_hunks(runner, paths, max_read_bytes=MAX_READ_BYTES, stats=None):
+    """Stream the staged diff of paths and keep the best hunks per file; returns {path: [hunk text]}"""
+    hunks = {}
+    current_path = None
+    current = None  # [lines kept, changed count, total lines]
+    read_bytes = 0
+
+    def finish_hunk():
+        if current_path is None or current is None:
+            return
+        kept, changed, total = current
+        if total > len(kept):
+            kept.append(f"... ({total - len(kept)} more lines)")
+        heap = hunks.setdefault(current_path, [])
+        entry = (score_hunk(kept, changed), len(heap), "\n".join(kept))
+        # Bounded min-heap: memory stays O(files * hunks) regardless of diff size
+        if len(heap) < MAX_HUNKS_PER_FILE:
+            heapq.heappush(heap, entry)
+        else:
+            heapq.heappushpop(heap, entry)
+
+    process = runner.popen("diff", "--cached", "-M", "--no-color", "--no-ext-diff", "-U2", "--", *paths)
+    try:
+        while read_bytes <= max_read_bytes:
+            raw = process.stdout.readline(MAX_LINE_BYTES)
+            if not raw:
+                break
+            read_bytes += len(raw)
+            if not raw.endswith(b"\n"):
+                # Never hold a whole long line: keep its head and drain the rest in bounded reads
+                while read_bytes <= max_read_bytes:
+                    rest = process.stdout.readline(MAX_LINE_BYTES)
+                    read_bytes += len(rest)
+                    if not rest or rest.endswith(b"\n"):
+                        break
+            if read_bytes > max_read_bytes:
+                break
+            line = raw.decode("utf-8", errors="replace").rstrip("\n")
+            if line.startswith("diff --git "):
+                finish_hunk()
+                current = None
+                current_path = None
+            elif line.startswith("+++ ") and current is None:
+                target = line[4:]
+                if target != "/dev/null":
+                    current_path = target[2:] if target.startswith("b/") else target
+            elif line.startswith("--- ") and current is None:
+                source = line[4:]
+                if source != "/dev/null":
+                    current_path = source[2:] if source.startswith("a/") else source
+            elif line.startswith("@@"):
+                finish_hunk()
+                current = [[line], 0, 1]
+            elif current is not None:
+                current[2] += 1
+                if line[:1] in "+-":
+                    current[1] += 1
+                if len(current[0]) < MAX_HUNK_LINES:
+                    current[0].append(line[:200])
+        finish_hunk()
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+    if stats is not None:
+        stats["diff_bytes"] = stats.get("diff_bytes", 0) + read_bytes
+
+    return {
+        path: [text for _score, _order, text in sorted(heap, reverse=True)]
+        for path, heap in hunks.items()
+    }
+
+
+def trim_hunk(hunk, limit):
+    """Cut a hunk at a line boundary so it fits in limit characters"""
+    if len(hunk) <= limit:
+        return hunk
+    lines = hunk.split("\n")
+    kept = []
+    size = 0
+    for line in lines:
+        if size + len(line) + 1 > limit and kept:
+            break
+        kept.append(line)
+        size += len(line) + 1
+    kept.append(f"... ({len(lines) - len(kept)} more lines)")
+    return "\n".join(kept)
+
+
+def summarize_staged_diff(runner, token_budget=750, stats=None, numstat=None):
+    """Build a diff summary of the staged changes within token_budget (bytes read and numstat go to stats)"""
+    # A caller summarizing part of the change set passes its share of one whole-diff numstat;
+    # only the top MAX_FILES paths are ever handed to git as arguments
+    if numstat is None:
+        numstat_output = runner.run("diff", "--cached", "-M", "--numstat", "-z")
+        if numstat_output.startswith("Error"):
+            return ""
+        if stats is not None:
+            stats["diff_bytes"] = stats.get("diff_bytes", 0) + len(numstat_output)
+        numstat = parse_numstat(numstat_output)
+    numstat = rank_files(numstat)
+    if stats is not None:
+        stats["numstat"] = numstat
+    if not numstat:
+        return ""
+
+    budget = token_budget * CHARS_PER_TOKEN
+    total_added = sum(entry[0] for entry in numstat)
+    total_deleted = sum(entry[1] for entry in numstat)
+    parts = [f"{len(numstat)} files changed, +{total_added} -{total_deleted}"]
+    # Binary files are described by size only; their content is never rendered
+    binary_paths = [entry[2] for entry in numstat if entry[3]][:MAX_FILES]
+    sizes = binary_sizes(runner, binary_paths) if binary_paths else {}
+    for added, deleted, path, is_binary, orig_path in numstat:
+        name = f"{orig_path} -> {path}" if orig_path else path
+        if is_binary and path in sizes:
+            line = f" {name} | binary {sizes[path][0]} -> {sizes[path][1]} bytes"
+        elif is_binary:
+            line = f" {name} | binary"
+        else:
+            line = f" {name} | +{added} -{deleted}"
+        if sum(len(part) + 1 for part in parts) + len(line) > budget // 3:
+            parts.append(f" ... and {len(numstat) - len(parts) + 1} more files")
+            break
+        parts.append(line)
+    summary = "\n".join(parts)
+
+    text_entries = [entry for entry in numstat if not entry[3]][:MAX_FILES]
+    text_paths = [entry[2] for entry in text_entries]
+    if not text_paths:
+        return summary
+    # Both sides of a rename go in the pathspec, or git shows the new path as a whole-file addition
+    orig_paths = [entry[4] for entry in text_entries if entry[4]]
+    hunks = read_hunks(runner, text_paths + orig_paths, stats=stats)
+
+    # Round-robin over files in rank order: every file's best hunk before anyone's second
+    sections = {path: [] for path in text_paths}
+    used = len(summary)
+    # Each file's first hunk is trimmed to a fair share so one large hunk cannot take everything
+    fair_share = max((budget - used) // max(len(hunks), 1), 240)
+    for round_index in range(MAX_HUNKS_PER_FILE):
+        progressed = False
+        for path in text_paths:
+            file_hunks = hunks.get(path, [])
+            if round_index >= len(file_hunks):
+                continue
+            hunk = file_hunks[round_index]
+            if round_index == 0:
+                hunk = trim_hunk(hunk, fair_share)
+            cost = len(hunk) + 1 + (0 if sections[path] else len(path) + 6)
+            if used + cost > budget:
+                continue
+            sections[path].append(hunk)
+            used += cost
+            progressed = True
+        if not progressed:
+            break
+
+    for path in text_paths:
+        if sections[path]:
+            summary += f"\n\n--- {path}\n" + "\n".join(sections[path])
+    return summary
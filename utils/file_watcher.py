@@ -0,0 +1,433 @@
+"""
+Event-driven file watching for the auto-commit watcher
+Pure-Python inotify bindings (Linux only) plus an in-process .gitignore matcher
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import re
+import selectors
+import struct
+import sys
+import threading
+
+# inotify event flags (see <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+    | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK
+)
+
+EVENT_HEADER = struct.Struct("iIII")
+
+# Reported instead of a path when the kernel event queue overflowed
+OVERFLOW = "*"
+
+
+def _load_libc():
+    """Load libc with the inotify entry points, or return None"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+_libc = _load_libc()
+
+
+def inotify_available():
+    """Return True if inotify can be used on this platform"""
+    return _libc is not None
+
+
+def _gitignore_pattern_to_regex(pattern):
+    """Translate a single gitignore glob into a regex matched against a relative path"""
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "/.*"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                regex += re.escape(pattern[i])
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex += f"[{body}]"
+                i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+
+    if anchored:
+        return re.compile(f"^{regex}$")
+    return re.compile(f"^(?:.*/)?{regex}$")
+
+
+class GitIgnoreMatcher:
+    """Evaluate .gitignore rules in-process so ignored paths never reach git"""
+
+    def __init__(self, root, always_include=None, excludes_file=None):
+        self.root = os.path.abspath(root)
+        # Tracked files that happen to match an ignore rule still matter to git, and so
+        # do the directories holding them, even when a rule ignores the whole directory
+        self.always_include = set(always_include or [])
+        self.include_dirs = set()
+        for path in self.always_include:
+            parts = path.split("/")
+            self.include_dirs.update("/".join(parts[:depth]) for depth in range(1, len(parts)))
+        self.excludes_file = excludes_file
+        self.rules = {}
+        self.load_directory("")
+
+    @staticmethod
+    def _parse_file(path):
+        """Parse a gitignore-style file into (regex, negate, dir_only) rules"""
+        rules = []
+        try:
+            with open(path, "r", errors="replace") as ignore_file:
+                lines = ignore_file.read().splitlines()
+        except OSError:
+            return rules
+
+        for line in lines:
+            if not line.strip() or line.startswith("#"):
+                continue
+            line = line.rstrip(" ")
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            elif line.startswith("\\"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            rules.append((_gitignore_pattern_to_regex(line), negate, dir_only))
+        return rules
+
+    def load_directory(self, rel_dir):
+        """(Re)load the .gitignore that lives in rel_dir"""
+        path = os.path.join(self.root, rel_dir, ".gitignore")
+        rules = self._parse_file(path)
+        if rel_dir == "":
+            # Lowest precedence first: core.excludesFile, then .git/info/exclude
+            exclude_file = os.path.join(self.root, ".git", "info", "exclude")
+            rules = self._parse_file(exclude_file) + rules
+            if self.excludes_file:
+                rules = self._parse_file(self.excludes_file) + rules
+        if rules:
+            self.rules[rel_dir] = rules
+        else:
+            self.rules.pop(rel_dir, None)
+
+    def is_ignored(self, rel_path, is_dir=False):
+        """Return True if git would ignore rel_path (relative to the root)"""
+        parts = rel_path.split("/")
+        if ".git" in parts:
+            return True
+        if rel_path in self.always_include or (is_dir and rel_path in self.include_dirs):
+            return False
+        if self._matches(parts, is_dir):
+            return True
+        # Directories are normally pruned once ignored; inside one kept only for its tracked
+        # files, everything else stays ignored
+        for depth in range(len(parts) - 1, 0, -1):
+            ancestor = "/".join(parts[:depth])
+            if ancestor in self.include_dirs and self._matches(parts[:depth], True):
+                return True
+        return False
+
+    def _matches(self, parts, is_dir):
+        """Evaluate the loaded rules against a path split into its components"""
+        ignored = False
+        # Rules from shallower .gitignore files are evaluated first; deeper ones win
+        for depth in range(len(parts)):
+            base = "/".join(parts[:depth])
+            rules = self.rules.get(base)
+            if not rules:
+                continue
+            sub_path = "/".join(parts[depth:])
+            for regex, negate, dir_only in rules:
+                if dir_only and not is_dir:
+                    continue
+                if regex.match(sub_path):
+                    ignored = not negate
+        return ignored
+
+
+def global_excludes_file(runner):
+    """core.excludesFile of runner's repository, or git's default $XDG_CONFIG_HOME/git/ignore"""
+    configured = runner.run("config", "--path", "--get", "core.excludesFile")
+    if configured and not configured.startswith("Error"):
+        return configured
+    config_home = os.getenv("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(config_home, "git", "ignore")
+
+
+def wait_readable(fd, timeout=None):
+    """True if fd becomes readable within timeout seconds (works for any fd number, unlike select())"""
+    with selectors.DefaultSelector() as selector:
+        selector.register(fd, selectors.EVENT_READ)
+        return bool(selector.select(timeout))
+
+
+class InotifyHub:
+    """One inotify instance shared by many watchers, dispatching events by watch descriptor"""
+
+    def __init__(self):
+        if _libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+        self.fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+        # The kernel hands out one wd per inode, so nested or repeated roots share it
+        self.owners = {}  # wd -> {watcher: directory path relative to its root}
+        self.watchers = set()
+
+    def add_watch(self, watcher, path, rel_dir):
+        """Watch path on behalf of watcher; return the wd, or None if the directory vanished"""
+        wd = _libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return None  # Directory vanished before we could watch it
+            # ENOSPC means fs.inotify.max_user_watches is exhausted
+            raise OSError(err, f"inotify_add_watch failed for {path}: {os.strerror(err)}")
+        self.owners.setdefault(wd, {})[watcher] = rel_dir
+        self.watchers.add(watcher)
+        return wd
+
+    def remove_watcher(self, watcher):
+        """Drop every watch held only by watcher"""
+        self.watchers.discard(watcher)
+        for wd in list(self.owners):
+            owners = self.owners[wd]
+            if owners.pop(watcher, None) is not None and not owners:
+                del self.owners[wd]
+                if self.fd >= 0:
+                    _libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self, timeout=None):
+        """Wait up to timeout seconds and return {watcher: set of changed relative paths}"""
+        if self.fd < 0 or not wait_readable(self.fd, timeout):
+            return {}
+        changed = {}
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            self._dispatch(data, changed)
+        return changed
+
+    def _dispatch(self, data, changed):
+        """Decode a buffer of inotify events and hand each one to the watchers that own its wd"""
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # The queue is shared, so every watcher may have missed something
+                for watcher in self.watchers:
+                    changed.setdefault(watcher, set()).add(OVERFLOW)
+                    with watcher.dirty_lock:
+                        watcher.lost_events = True
+                continue
+            if mask & IN_IGNORED:
+                for watcher in self.owners.pop(wd, {}):
+                    watcher.watches.pop(wd, None)
+                continue
+            for watcher, rel_dir in list(self.owners.get(wd, {}).items()):
+                try:
+                    paths = watcher.handle_event(rel_dir, mask, name)
+                except OSError as e:
+                    # e.g. ENOSPC (fs.inotify.max_user_watches) or EACCES on a new directory: part
+                    # of this tree is now unwatched, which must not take the other repositories down
+                    print(f"\n⚠️  Could not watch new directories in {watcher.root}: {e}")
+                    with watcher.dirty_lock:
+                        watcher.lost_events = True
+                    watcher.incomplete = True
+                    paths = {OVERFLOW}
+                if paths:
+                    changed.setdefault(watcher, set()).update(paths)
+
+    def close(self):
+        """Release the inotify file descriptor"""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+        self.owners.clear()
+        self.watchers.clear()
+
+
+_shared_hub = None
+
+
+def get_shared_inotify():
+    """Return the process-wide InotifyHub, so hundreds of repositories cost one inotify instance"""
+    global _shared_hub
+    if _shared_hub is None or _shared_hub.fd < 0:
+        _shared_hub = InotifyHub()
+    return _shared_hub
+
+
+class InotifyWatcher:
+    """Recursively watch a directory tree and report changed paths"""
+
+    def __init__(self, root, matcher=None, hub=None):
+        self.root = os.path.abspath(root)
+        self.matcher = matcher or GitIgnoreMatcher(self.root)
+        self.watches = {}  # wd -> directory path relative to root
+        # Directories that saw events since take_dirty_dirs() was last called
+        self.dirty_dirs = set()
+        self.lost_events = False  # The event queue overflowed, so dirty_dirs is incomplete
+        self.incomplete = False  # Some directories could not be watched, so events can be missed
+        self.dirty_lock = threading.Lock()
+        # A watcher without a hub owns a private inotify instance
+        self.owns_hub = hub is None
+        self.hub = hub or InotifyHub()
+
+        try:
+            self._watch_tree("")
+        except OSError:
+            self.close()
+            raise
+
+    @property
+    def fd(self):
+        return self.hub.fd
+
+    def close(self):
+        """Drop this watcher's watches (and its inotify instance, if private)"""
+        self.hub.remove_watcher(self)
+        if self.owns_hub:
+            self.hub.close()
+        self.watches.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _add_watch(self, rel_dir):
+        """Add a single watch for rel_dir"""
+        path = os.path.join(self.root, rel_dir) if rel_dir else self.root
+        wd = self.hub.add_watch(self, path, rel_dir)
+        if wd is not None:
+            self.watches[wd] = rel_dir
+
+    def _watch_tree(self, rel_dir):
+        """Watch rel_dir and every non-ignored directory below it; return files found"""
+        found = []
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            self._add_watch(current)
+            if os.path.exists(os.path.join(self.root, current, ".gitignore")):
+                self.matcher.load_directory(current)
+            try:
+                entries = list(os.scandir(os.path.join(self.root, current)))
+            except OSError:
+                continue
+            for entry in entries:
+                rel_path = f"{current}/{entry.name}" if current else entry.name
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if self.matcher.is_ignored(rel_path, is_dir):
+                    continue
+                if is_dir:
+                    stack.append(rel_path)
+                else:
+                    found.append(rel_path)
+        return found
+
+    def read_events(self, timeout=None):
+        """Wait up to timeout seconds and return the set of changed relative paths"""
+        # Events for other watchers on a shared hub are read too, so only private hubs may do this
+        return self.hub.read_events(timeout).get(self, set())
+
+    def take_dirty_dirs(self):
+        """Return and reset the directories that saw events, or None if some events were lost"""
+        with self.dirty_lock:
+            dirty, self.dirty_dirs = self.dirty_dirs, set()
+            lost, self.lost_events = self.lost_events, False
+        return None if lost else dirty
+
+    def handle_event(self, rel_dir, mask, name):
+        """Turn one inotify event in rel_dir into the changed paths it implies"""
+        with self.dirty_lock:
+            self.dirty_dirs.add(rel_dir)
+        if not name:
+            return ()  # Event on the watched directory itself
+
+        name = os.fsdecode(name)
+        rel_path = f"{rel_dir}/{name}" if rel_dir else name
+        is_dir = bool(mask & IN_ISDIR)
+        if self.matcher.is_ignored(rel_path, is_dir):
+            return ()
+
+        changed = set()
+        if name == ".gitignore":
+            self.matcher.load_directory(rel_dir)
+        if is_dir and mask & (IN_CREATE | IN_MOVED_TO):
+            # Files may land in a new directory before its watch exists
+            changed.update(self._watch_tree(rel_path))
+            with self.dirty_lock:
+                self.dirty_dirs.add(rel_path)
+        changed.add(rel_path)
+        return changed
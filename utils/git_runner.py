@@ -0,0 +1,278 @@
+"""
+GitRunner: run git against one repository with as few process spawns as possible
+Related queries are batched into single git invocations with machine-readable
+output, and independent invocations run concurrently on a shared thread pool
+"""
+
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# Field/record separators used in --format strings
+FIELD_SEP = "\x00"
+RECORD_SEP = "\x1e"
+
+LOG_FORMAT = "%x1e" + "%x00".join(["%H", "%h", "%D", "%an", "%ae", "%ad", "%s", "%B"])
+
+_shared_executor = None
+
+
+def get_shared_executor():
+    """Return the process-wide thread pool used for concurrent git queries"""
+    global _shared_executor
+    if _shared_executor is None:
+        workers = int(os.environ.get("GIT_RUNNER_WORKERS", "8"))
+        _shared_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="git")
+    return _shared_executor
+
+
+def parse_log(output):
+    """Parse `git log --format=LOG_FORMAT` output into a list of commit dicts"""
+    commits = []
+    for record in output.split(RECORD_SEP):
+        if not record.strip():
+            continue
+        fields = record.split(FIELD_SEP)
+        if len(fields) < 8:
+            continue
+        commits.append({
+            "hash": fields[0].strip(),
+            "short_hash": fields[1],
+            "decorations": fields[2],
+            "author_name": fields[3],
+            "author_email": fields[4],
+            "date": fields[5],
+            "subject": fields[6],
+            "message": FIELD_SEP.join(fields[7:]).strip(),
+        })
+    return commits
+
+
+def parse_for_each_ref(output):
+    """Parse `git for-each-ref --format=%(HEAD)%00%(refname:short)` into (current, branches)"""
+    current = None
+    branches = []
+    for line in output.splitlines():
+        head_marker, _, name = line.partition(FIELD_SEP)
+        if not name:
+            continue
+        branches.append(name)
+        if head_marker == "*":
+            current = name
+    return current, branches
+
+
+def parse_status_v2(output):
+    """Parse `git status --porcelain=v2 --branch -z` into branch info and change entries"""
+    status = {
+        "branch": None,
+        "oid": None,
+        "upstream": None,
+        "ahead": 0,
+        "behind": 0,
+        "entries": [],
+    }
+    records = output.split("\0")
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if not record:
+            continue
+
+        if record.startswith("# "):
+            key, _, value = record[2:].partition(" ")
+            if key == "branch.head":
+                status["branch"] = None if value == "(detached)" else value
+            elif key == "branch.oid":
+                status["oid"] = None if value == "(initial)" else value
+            elif key == "branch.upstream":
+                status["upstream"] = value
+            elif key == "branch.ab":
+                ahead, _, behind = value.partition(" ")
+                status["ahead"] = int(ahead.lstrip("+") or 0)
+                status["behind"] = int(behind.lstrip("-") or 0)
+            continue
+
+        kind = record[0]
+        if kind == "1":
+            # 1 XY sub mH mI mW hH hI path
+            fields = record.split(" ", 8)
+            status["entries"].append({"xy": fields[1], "path": fields[8], "orig_path": None})
+        elif kind == "2":
+            # 2 XY sub mH mI mW hH hI Xscore path, followed by the original path record
+            fields = record.split(" ", 9)
+            orig_path = records[i] if i < len(records) else None
+            i += 1
+            status["entries"].append({"xy": fields[1], "path": fields[9], "orig_path": orig_path})
+        elif kind == "u":
+            # u XY sub m1 m2 m3 mW h1 h2 h3 path
+            fields = record.split(" ", 10)
+            status["entries"].append({"xy": fields[1], "path": fields[10], "orig_path": None})
+        elif kind in "?!":
+            xy = "??" if kind == "?" else "!!"
+            status["entries"].append({"xy": xy, "path": record[2:], "orig_path": None})
+    return status
+
+
+def parse_name_status(output):
+    """Parse `git diff --name-status -z` into {"status", "path", "orig_path"} entries"""
+    entries = []
+    records = output.split("\0")
+    i = 0
+    while i < len(records):
+        status = records[i]
+        i += 1
+        if not status:
+            continue
+        if status[0] in "RC":
+            # Renames and copies: the old and new paths follow as separate records
+            orig_path = records[i] if i < len(records) else ""
+            path = records[i + 1] if i + 1 < len(records) else ""
+            i += 2
+        else:
+            orig_path, path = None, records[i] if i < len(records) else ""
+            i += 1
+        entries.append({"status": status[0], "path": path, "orig_path": orig_path})
+    return entries
+
+
+def format_short_status(entries):
+    """Render parsed status entries the way `git status --short` does"""
+    lines = []
+    for entry in entries:
+        xy = entry["xy"].replace(".", " ")
+        if entry["orig_path"]:
+            lines.append(f"{xy} {entry['orig_path']} -> {entry['path']}")
+        else:
+            lines.append(f"{xy} {entry['path']}")
+    return "\n".join(lines)
+
+
+def format_oneline(commit):
+    """Render a parsed commit the way `git log --oneline --decorate` does"""
+    if commit["decorations"]:
+        return f"{commit['short_hash']} ({commit['decorations']}) {commit['subject']}"
+    return f"{commit['short_hash']} {commit['subject']}"
+
+
+class GitRunner:
+    """Run git commands against one repository without relying on the process cwd"""
+
+    def __init__(self, repo_path, executor=None, env=None):
+        self.repo_path = os.path.abspath(repo_path)
+        self.executor = executor
+        self.env = dict(env or {})  # Applied to every git call (e.g. a private GIT_INDEX_FILE)
+
+    def _env(self, env=None):
+        if not self.env and not env:
+            return None
+        run_env = os.environ.copy()
+        run_env.update(self.env)
+        run_env.update(env or {})
+        return run_env
+
+    def run_process(self, *args, env=None, input=None):
+        """Run git with the given argv and return the CompletedProcess"""
+        run_env = self._env(env)
+        return subprocess.run(
+            ["git", *args],
+            cwd=self.repo_path,
+            env=run_env,
+            input=input,
+            capture_output=True,
+            text=True,
+        )
+
+    def popen(self, *args):
+        """Start git with the given argv and stream its stdout as bytes (readline(limit) bounds memory)"""
+        return subprocess.Popen(
+            ["git", *args],
+            cwd=self.repo_path,
+            env=self._env(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def run(self, *args, env=None, input=None):
+        """Run git with the given argv and return its output, or "Error: ..." on failure"""
+        result = self.run_process(*args, env=env, input=input)
+        if result.returncode != 0:
+            return f"Error: {result.stderr.strip()}"
+        return result.stdout.strip()
+
+    def run_many(self, queries):
+        """Run independent read-only queries concurrently; queries maps name -> argv"""
+        executor = self.executor or get_shared_executor()
+        # Read-only queries must not take index.lock away from a concurrent commit
+        env = {"GIT_OPTIONAL_LOCKS": "0"}
+        futures = {
+            name: executor.submit(self.run_process, *args, env=env)
+            for name, args in queries.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+    def update_index_paths(self, paths):
+        """Stage additions, modifications and deletions of exactly these paths with `git update-index`"""
+        if not paths:
+            return ""
+        # Paths go over stdin, so there is no argv size limit to batch around
+        return self.run("update-index", "--add", "--remove", "-z", "--stdin", input="".join(f"{path}\0" for path in paths))
+
+    def log(self, count=1):
+        """Return the last `count` commits as dicts"""
+        result = self.run_process("log", f"-{count}", f"--format={LOG_FORMAT}")
+        if result.returncode != 0:
+            return []
+        return parse_log(result.stdout)
+
+    def branches(self):
+        """Return (current_branch, [local branches]) from a single for-each-ref call"""
+        result = self.run_process(
+            "for-each-ref", "--format=%(HEAD)%00%(refname:short)", "refs/heads"
+        )
+        if result.returncode != 0:
+            return None, []
+        return parse_for_each_ref(result.stdout)
+
+    def status(self, untracked_files="normal", refresh_index=False):
+        """Return parsed `git status --porcelain=v2 --branch` output, or None if not a repo"""
+        # Read-only callers skip the opportunistic index refresh; the watcher wants it so
+        # touched-but-unchanged files stop looking dirty to `git diff-index`
+        result = self.run_process(
+            "status", "--porcelain=v2", "--branch", "-z", f"--untracked-files={untracked_files}",
+            env=None if refresh_index else {"GIT_OPTIONAL_LOCKS": "0"},
+        )
+        if result.returncode != 0:
+            return None
+        return parse_status_v2(result.stdout)
+
+    def details(self, recent=5):
+        """Collect everything get_git_details shows using five concurrent git calls"""
+        results = self.run_many({
+            "log": ["log", f"-{recent}", f"--format={LOG_FORMAT}"],
+            "refs": ["for-each-ref", "--format=%(HEAD)%00%(refname:short)", "refs/heads"],
+            "status": ["status", "--porcelain=v2", "--branch", "-z"],
+            "remote": ["config", "--get", "remote.origin.url"],
+            "count": ["rev-list", "--count", "HEAD"],
+        })
+
+        status_result = results["status"]
+        if status_result.returncode != 0:
+            return None
+
+        status = parse_status_v2(status_result.stdout)
+        commits = parse_log(results["log"].stdout) if results["log"].returncode == 0 else []
+        _, branches = parse_for_each_ref(results["refs"].stdout)
+        count = results["count"].stdout.strip() if results["count"].returncode == 0 else "0"
+
+        return {
+            "path": self.repo_path,
+            "branch": status["branch"],
+            "head": commits[0] if commits else None,
+            "remote_url": results["remote"].stdout.strip(),
+            "status": status,
+            "commit_count": int(count) if count.isdigit() else 0,
+            "branches": branches,
+            "recent_commits": commits,
+        }
@@ -0,0 +1,299 @@
+"""
+Long-lived HTTP client for OpenAI-compatible chat completion endpoints (OpenRouter by default)
+Connections are pooled and kept alive across watcher iterations; 429/5xx responses
+and connection errors are retried with jittered exponential backoff. Several
+providers can be chained: a backup request is hedged after a delay, the first
+valid answer within the latency budget wins, and providers are tried in order
+of their latency EWMA
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+try:
+    import httpx
+    import h2  # noqa: F401  (httpx only speaks HTTP/2 when h2 is installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTP2_AVAILABLE = False
+
+load_dotenv()
+
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "google/gemma-3-27b-it:free")
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "4"))
+# Comma-separated providers, each "model", "model@base_url" or "model@base_url@API_KEY_ENV_VAR"
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", "")
+LLM_LATENCY_BUDGET = float(os.getenv("LLM_LATENCY_BUDGET", "20"))
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "3"))
+LLM_EWMA_ALPHA = float(os.getenv("LLM_EWMA_ALPHA", "0.3"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LLMClientError(Exception):
+    """Raised when a chat completion request fails after all retries"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMClient:
+    """Pooled, keep-alive client for one OpenAI-compatible endpoint"""
+
+    def __init__(self, api_key, base_url=OPENROUTER_BASE_URL, pool_size=LLM_POOL_SIZE,
+                 connect_timeout=LLM_CONNECT_TIMEOUT, read_timeout=LLM_READ_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES, backoff_base=0.5, backoff_cap=8.0):
+        self.base_url = base_url.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://github.com",
+            "X-Title": "Git Auto-Commit Tool",
+        }
+
+        if HTTP2_AVAILABLE:
+            self.http2 = True
+            self.session = httpx.Client(
+                http2=True,
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            )
+            self.transport_errors = (httpx.TransportError,)
+        else:
+            self.http2 = False
+            self.session = requests.Session()
+            self.session.headers.update(self.headers)
+            # Retries are handled below so they can be jittered and honour Retry-After
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+            self.transport_errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+
+    def _post(self, url, payload):
+        if self.http2:
+            return self.session.post(url, json=payload)
+        return self.session.post(url, json=payload, timeout=(self.connect_timeout, self.read_timeout))
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, or the server's Retry-After if it asked for one"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_cap)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def complete(self, messages, model=OPENROUTER_MODEL, max_tokens=100, temperature=0.7):
+        """Send a chat completion request and return (content, usage dict)"""
+        url = f"{self.base_url}/chat/completions"
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+
+        attempt = 0
+        while True:
+            try:
+                response = self._post(url, payload)
+            except self.transport_errors as e:
+                if attempt >= self.max_retries:
+                    raise LLMClientError(f"request failed: {e}")
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code == 200:
+                try:
+                    body = response.json()
+                    return body["choices"][0]["message"]["content"], body.get("usage") or {}
+                except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+                    raise LLMClientError(f"unexpected response body: {e}")
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, response.headers.get("Retry-After")))
+                attempt += 1
+                continue
+
+            raise LLMClientError(f"({response.status_code}): {response.text}", response.status_code)
+
+
+class Provider:
+    """One model on one endpoint, with its latency EWMA"""
+
+    def __init__(self, name, client, model):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.ewma = None  # Seconds; None until the first answer (or failure)
+
+
+def parse_providers(spec, default_api_key):
+    """Parse LLM_PROVIDERS into (model, base_url, api_key) tuples"""
+    providers = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        model, _, rest = entry.partition("@")
+        base_url, _, key_env = rest.partition("@")
+        api_key = os.getenv(key_env, "") if key_env else default_api_key
+        providers.append((model, base_url or OPENROUTER_BASE_URL, api_key))
+    return providers
+
+
+class LLMChain:
+    """Hedged requests over an ordered list of providers, bounded by a latency budget"""
+
+    def __init__(self, providers, latency_budget=LLM_LATENCY_BUDGET, hedge_delay=LLM_HEDGE_DELAY,
+                 ewma_alpha=LLM_EWMA_ALPHA, max_workers=None):
+        self.providers = providers
+        self.latency_budget = latency_budget
+        self.hedge_delay = hedge_delay
+        self.ewma_alpha = ewma_alpha
+        self.lock = threading.Lock()
+        # Losing requests keep running in the background so their latency still feeds the EWMA;
+        # a request that waits for a thread is spending its latency budget before it is sent
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or max(8, 2 * len(providers)), thread_name_prefix="llm"
+        )
+
+    def close(self):
+        """Close every provider's pooled connections"""
+        self.executor.shutdown(wait=False)
+        for provider in self.providers:
+            provider.client.close()
+
+    def ordered(self):
+        """Providers fastest-first by EWMA; unmeasured ones keep their configured order after measured ones"""
+        with self.lock:
+            return sorted(self.providers, key=lambda p: p.ewma if p.ewma is not None else float("inf"))
+
+    def _record(self, provider, latency):
+        with self.lock:
+            if provider.ewma is None:
+                provider.ewma = latency
+            else:
+                provider.ewma += self.ewma_alpha * (latency - provider.ewma)
+
+    def _call(self, provider, messages, max_tokens, temperature):
+        started = time.monotonic()
+        try:
+            content, usage = provider.client.complete(messages, provider.model, max_tokens, temperature)
+        except Exception:
+            # A failure counts as a full budget of latency so the provider drops down the order
+            self._record(provider, max(time.monotonic() - started, self.latency_budget))
+            raise
+        self._record(provider, time.monotonic() - started)
+        if not content or not content.strip():
+            raise LLMClientError(f"{provider.name} returned an empty message")
+        return content, usage
+
+    def complete(self, messages, max_tokens=100, temperature=0.7):
+        """Return (content, usage, provider name) from the first provider with a valid answer"""
+        deadline = time.monotonic() + self.latency_budget
+        pending = {}  # future -> provider
+        waiting = self.ordered()
+        errors = []
+        next_hedge = 0.0
+
+        while True:
+            now = time.monotonic()
+            # Launch the next provider when nothing is running (the previous one failed)
+            # or when everything running has been quiet for the hedge delay
+            if waiting and (not pending or now >= next_hedge):
+                provider = waiting.pop(0)
+                pending[self.executor.submit(self._call, provider, messages, max_tokens, temperature)] = provider
+                next_hedge = now + self.hedge_delay
+            if not pending or now >= deadline:
+                break
+
+            timeout = deadline - now
+            if waiting:
+                timeout = min(timeout, next_hedge - now)
+            done, _ = wait(pending, timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    content, usage = future.result()
+                    return content, usage, provider.name
+                except Exception as e:
+                    errors.append(f"{provider.name}: {e}")
+
+        if pending:
+            errors.append(f"no answer within the {self.latency_budget:g}s budget")
+        raise LLMClientError("; ".join(errors) or "no LLM providers configured")
+
+
+_chain = None
+_chain_key = None
+_client_lock = threading.Lock()
+_concurrency = LLM_POOL_SIZE  # Requests the process may have in flight at once, per provider
+
+
+def set_llm_concurrency(requests_in_flight):
+    """Size connection pools for this many concurrent requests (commit workers x parallel shards)"""
+    global _concurrency, _chain
+    with _client_lock:
+        if requests_in_flight <= _concurrency:
+            return
+        _concurrency = requests_in_flight
+        # pool_block=True and the chain's thread pool would otherwise queue the extra requests
+        if _chain is not None:
+            _chain.close()
+            _chain = None
+
+
+def get_llm_chain(api_key):
+    """Return the process-wide LLMChain built from LLM_PROVIDERS (or the single OpenRouter model)"""
+    global _chain, _chain_key
+    with _client_lock:
+        if _chain is not None and _chain_key == api_key:
+            return _chain
+        if _chain is not None:
+            _chain.close()
+
+        specs = parse_providers(LLM_PROVIDERS or OPENROUTER_MODEL, api_key)
+        # With a backup to hedge to, a provider should fail over rather than retry for long
+        max_retries = LLM_MAX_RETRIES if len(specs) == 1 else min(LLM_MAX_RETRIES, 1)
+        # Providers on the same endpoint and key share one connection pool, hedged requests included
+        endpoints = [(base_url, provider_key) for _model, base_url, provider_key in specs]
+        clients = {}
+        providers = []
+        for model, base_url, provider_key in specs:
+            client = clients.get((base_url, provider_key))
+            if client is None:
+                pool_size = _concurrency * endpoints.count((base_url, provider_key))
+                client = clients[(base_url, provider_key)] = LLMClient(
+                    provider_key, base_url, pool_size=pool_size, max_retries=max_retries
+                )
+            name = model if base_url == OPENROUTER_BASE_URL else f"{model}@{base_url}"
+            providers.append(Provider(name, client, model))
+        # Every request in flight may be hedged to every provider
+        _chain = LLMChain(providers, max_workers=max(8, _concurrency * len(providers)))
+        _chain_key = api_key
+        return _chain
@@ -0,0 +1,201 @@
+"""
+Background maintenance for auto-committed repositories
+A steady stream of small commits leaves thousands of loose objects and packs
+behind, which slowly makes status, log and rev-list more expensive. Watched
+repositories get incremental `git maintenance` tasks once they have been idle for
+a while: loose objects are packed, the commit-graph is extended and the
+multi-pack-index is rewritten, each at low CPU/IO priority and within a per-repo
+time budget. Tasks that do not fit in the budget resume on the next run. Runs
+happen one repository at a time on a thread of their own, so they never hold a
+check worker, and new activity in the repository cuts the running task short
+"""
+
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import nullcontext
+
+# Cheapest and most valuable first; incremental-repack also writes the multi-pack-index
+MAINTENANCE_TASKS = ["loose-objects", "commit-graph", "incremental-repack"]
+
+NICENESS = 10
+
+
+class MaintenanceState:
+    """Activity and maintenance history for one repository"""
+
+    def __init__(self):
+        self.last_activity = time.monotonic()
+        self.last_run = None
+        self.next_task = 0  # Where the last run stopped when it ran out of budget
+
+
+class RepoMaintenance:
+    """Run incremental maintenance on idle repositories without overlapping their commit cycles"""
+
+    def __init__(self, interval=3600, idle_seconds=120, budget_seconds=60, tasks=None, metrics=None):
+        self.interval = interval
+        self.idle_seconds = idle_seconds
+        self.budget_seconds = budget_seconds
+        self.tasks = list(tasks or MAINTENANCE_TASKS)
+        self.metrics = metrics
+        self.states = {}  # path -> MaintenanceState
+        self.lock = threading.Lock()
+        self.requests = queue.Queue()  # (runner, can_run) waiting for the maintenance thread
+        self.queued = set()
+        self.active = None  # Repository being maintained right now
+        self.interrupted = False  # Set when the active repository has new changes
+        # Idle IO class where ionice exists (Linux) and lower CPU priority where nice does; no
+        # preexec_fn, which is unsafe to fork with from a threaded process
+        self.prefix = []
+        ionice = shutil.which("ionice")
+        if ionice:
+            self.prefix += [ionice, "-c", "3"]
+        nice = shutil.which("nice")
+        if nice:
+            self.prefix += [nice, "-n", str(NICENESS)]
+
+    def add_repo(self, path):
+        with self.lock:
+            self.states.setdefault(path, MaintenanceState())
+
+    def record_activity(self, path):
+        """Note that path just had changes; maintenance waits until it has been idle again"""
+        with self.lock:
+            self.states.setdefault(path, MaintenanceState()).last_activity = time.monotonic()
+            if self.active == path:
+                # Hand the repository back to its commit cycle; the task resumes next time
+                self.interrupted = True
+
+    def due(self, path, now=None):
+        """True if path has been idle long enough and was not maintained within the interval"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            state = self.states.get(path)
+            if state is None:
+                return False
+            if now - state.last_activity < self.idle_seconds:
+                return False
+            # A run cut short by its budget continues at the next idle check
+            return state.last_run is None or state.next_task or now - state.last_run >= self.interval
+
+    def _run_task(self, runner, task, deadline, should_stop):
+        """Run one maintenance task; return "ok", "error", "budget" or "stopped" """
+        process = subprocess.Popen(
+            [*self.prefix, "git", "maintenance", "run", f"--task={task}", "--quiet"],
+            cwd=runner.repo_path,
+            env=runner._env(),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        while True:
+            try:
+                _, stderr = process.communicate(timeout=0.5)
+                break
+            except subprocess.TimeoutExpired:
+                stopped = should_stop is not None and should_stop()
+                if stopped or time.monotonic() >= deadline:
+                    # git only renames finished files into place, so an interrupted task is harmless
+                    process.terminate()
+                    process.communicate()
+                    return "stopped" if stopped else "budget"
+        if process.returncode != 0:
+            print(f"⚠️  git maintenance {task} failed in {runner.repo_path}: {stderr.strip()}")
+            return "error"
+        return "ok"
+
+    def run(self, runner, should_stop=None):
+        """Run due tasks for runner's repository within the budget; return [(task, seconds, outcome)]"""
+        path = runner.repo_path
+        with self.lock:
+            state = self.states.setdefault(path, MaintenanceState())
+            start_index = state.next_task
+        deadline = time.monotonic() + self.budget_seconds
+        results = []
+        next_task = 0
+        for index in range(start_index, len(self.tasks)):
+            task = self.tasks[index]
+            started = time.monotonic()
+            span = self.metrics.span("maintenance", path, task=task) if self.metrics else nullcontext({})
+            with span as fields:
+                outcome = self._run_task(runner, task, deadline, should_stop)
+                fields["result"] = outcome
+            results.append((task, time.monotonic() - started, outcome))
+            if outcome in ("budget", "stopped"):
+                next_task = index
+                break
+            if time.monotonic() >= deadline and index + 1 < len(self.tasks):
+                next_task = index + 1
+                break
+        with self.lock:
+            state.next_task = next_task
+            state.last_run = time.monotonic()
+        return results
+
+    def request(self, runner, can_run=None):
+        """Queue a run for runner's repository on the maintenance thread; can_run(path) gates it"""
+        with self.lock:
+            if runner.repo_path in self.queued or runner.repo_path == self.active:
+                return False
+            self.queued.add(runner.repo_path)
+        self.requests.put((runner, can_run))
+        return True
+
+    def _wait_until_free(self, path, can_run, should_stop, patience=5):
+        """True once can_run(path) holds (the requesting check may still be finishing)"""
+        deadline = time.monotonic() + patience
+        while can_run is not None and not can_run(path):
+            if should_stop() or time.monotonic() >= deadline:
+                return False
+            time.sleep(0.2)
+        return True
+
+    def serve(self, should_stop, on_done=None):
+        """Thread body: run queued maintenance one repository at a time"""
+        while not should_stop():
+            try:
+                runner, can_run = self.requests.get(timeout=1)
+            except queue.Empty:
+                continue
+            path = runner.repo_path
+            with self.lock:
+                self.queued.discard(path)
+            # The repository may have changed or become busy while it waited
+            if not self.due(path) or not self._wait_until_free(path, can_run, should_stop):
+                continue
+            with self.lock:
+                self.active = path
+                self.interrupted = False
+            try:
+                results = self.run(runner, lambda: should_stop() or self.interrupted)
+            finally:
+                with self.lock:
+                    self.active = None
+            if on_done:
+                on_done(path, results)
+
+    def watch(self, request_check, stop_event, period=None):
+        """Thread body: ask the scheduler to look at repositories whose maintenance is due"""
+        # Event-driven repositories are only checked on changes, so idle ones need a nudge;
+        # the check requests the maintenance once it has confirmed the tree is clean
+        period = period or max(min(self.idle_seconds, 60), 1)
+        while not stop_event.wait(period):
+            now = time.monotonic()
+            for path in list(self.states):
+                if self.due(path, now):
+                    request_check(path)
+
+    def start(self, request_check, stop_event, on_done=None):
+        """Start the watch() and serve() threads"""
+        threads = [
+            threading.Thread(target=self.watch, args=(request_check, stop_event), name="maintenance-watch",
+                             daemon=True),
+            threading.Thread(target=self.serve, args=(stop_event.is_set, on_done), name="maintenance",
+                             daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
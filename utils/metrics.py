@@ -0,0 +1,170 @@
+"""
+Per-phase timing instrumentation for the auto-commit cycle
+Every phase runs inside a timing span; spans are emitted as structured JSON log
+lines (through structlog when it is installed) and aggregated into histograms that
+are periodically written out in the Prometheus text exposition format
+"""
+
+import bisect
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import structlog
+except ImportError:
+    structlog = None
+
+DURATION_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+BYTES_BUCKETS = [1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216]
+TOKEN_BUCKETS = [50, 100, 250, 500, 1000, 2000, 4000, 8000]
+
+PROMETHEUS_WRITE_INTERVAL = 5  # Seconds between textfile rewrites
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds, as Prometheus expects"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metrics:
+    """Collects phase spans, diff sizes and LLM token counts for every watched repository"""
+
+    METRICS = {
+        "autocommit_phase_duration_seconds": ("Duration of auto-commit phases", DURATION_BUCKETS),
+        "autocommit_diff_bytes": ("Bytes of diff output read per commit", BYTES_BUCKETS),
+        "autocommit_llm_tokens": ("LLM tokens used per commit message", TOKEN_BUCKETS),
+    }
+
+    def __init__(self):
+        self.histograms = {}  # (metric, labels tuple) -> Histogram
+        self.lock = threading.Lock()
+        self.logger = None
+        self.log_file = None
+        self.prometheus_file = None
+        self.last_write = 0.0
+
+    def configure(self, json_log=None, prometheus_file=None):
+        """Send span events to json_log ("-" for stderr) and histograms to prometheus_file"""
+        if json_log:
+            self.log_file = sys.stderr if json_log == "-" else open(json_log, "a", buffering=1)
+            if structlog is not None:
+                self.logger = structlog.wrap_logger(
+                    structlog.PrintLogger(self.log_file),
+                    processors=[
+                        structlog.processors.TimeStamper(fmt="iso", utc=True),
+                        structlog.processors.JSONRenderer(),
+                    ],
+                )
+        self.prometheus_file = prometheus_file
+
+    def _log(self, event, **fields):
+        if self.log_file is None:
+            return
+        if self.logger is not None:
+            self.logger.info(event, **fields)
+        else:
+            fields = {"event": event, "timestamp": datetime.now(timezone.utc).isoformat(), **fields}
+            self.log_file.write(json.dumps(fields, default=str) + "\n")
+
+    def observe(self, metric, value, **labels):
+        """Record one observation of a histogram metric"""
+        key = (metric, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.METRICS[metric][1])
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, phase, repo, **fields):
+        """Time a phase of the auto-commit cycle; extra fields can be added to the yielded dict"""
+        fields = dict(fields)
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield fields
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            self.observe("autocommit_phase_duration_seconds", duration, repo=repo, phase=phase)
+            self._log("phase", repo=repo, phase=phase, duration_ms=round(duration * 1000, 3),
+                      outcome=outcome, **fields)
+            self.maybe_write_prometheus()
+
+    def record_diff_bytes(self, repo, byte_count):
+        self.observe("autocommit_diff_bytes", byte_count, repo=repo)
+
+    def record_llm_tokens(self, repo, usage):
+        """Record prompt/completion token counts from an OpenAI-style usage block"""
+        for kind in ("prompt", "completion"):
+            tokens = (usage or {}).get(f"{kind}_tokens")
+            if tokens is not None:
+                self.observe("autocommit_llm_tokens", tokens, repo=repo, kind=kind)
+
+    def render_prometheus(self):
+        """Render every histogram in the Prometheus text exposition format"""
+        with self.lock:
+            items = sorted(self.histograms.items(), key=lambda item: item[0])
+            lines = []
+            current_metric = None
+            for (metric, labels), histogram in items:
+                if metric != current_metric:
+                    help_text = self.METRICS[metric][0]
+                    lines.append(f"# HELP {metric} {help_text}")
+                    lines.append(f"# TYPE {metric} histogram")
+                    current_metric = metric
+                label_text = ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels)
+                running = 0
+                for bound, count in zip(histogram.buckets + ["+Inf"], histogram.counts):
+                    running += count
+                    lines.append(f'{metric}_bucket{{{label_text},le="{bound}"}} {running}')
+                lines.append(f"{metric}_sum{{{label_text}}} {histogram.sum}")
+                lines.append(f"{metric}_count{{{label_text}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self):
+        """Atomically rewrite the Prometheus textfile"""
+        if not self.prometheus_file:
+            return
+        directory = os.path.dirname(os.path.abspath(self.prometheus_file))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as tmp_file:
+                tmp_file.write(self.render_prometheus())
+            os.replace(tmp_path, self.prometheus_file)
+        except OSError as e:
+            print(f"⚠️  Could not write metrics file: {e}")
+        self.last_write = time.monotonic()
+
+    def maybe_write_prometheus(self):
+        if self.prometheus_file and time.monotonic() - self.last_write >= PROMETHEUS_WRITE_INTERVAL:
+            self.write_prometheus()
+
+    def close(self):
+        """Flush the textfile and close the JSON log"""
+        self.write_prometheus()
+        if self.log_file not in (None, sys.stderr):
+            self.log_file.close()
+        self.log_file = None
@@ -0,0 +1,115 @@
+"""
+Snapshot commits through a persistent private index
+The watcher keeps its own GIT_INDEX_FILE next to the repository's git data,
+stages only the changed paths into it with `git update-index`, and commits it
+with write-tree, commit-tree and a compare-and-swap update-ref. The developer's
+index is never refreshed or rewritten; after a commit only the committed paths
+are reset to the new HEAD so they do not show up as staged reverts
+"""
+
+import os
+import shutil
+
+from utils.git_runner import GitRunner
+from utils.temp_index import advance_ref, commit_tree, head_state
+
+SNAPSHOT_INDEX = "auto-commit-index"
+
+
+def snapshot_runner(runner):
+    """GitRunner for the same repository that uses the private snapshot index"""
+    git_dir = runner.run("rev-parse", "--absolute-git-dir")
+    if git_dir.startswith("Error"):
+        raise RuntimeError(git_dir)
+    return GitRunner(runner.repo_path, runner.executor, env={"GIT_INDEX_FILE": os.path.join(git_dir, SNAPSHOT_INDEX)})
+
+
+def _head_file(runner):
+    return runner.env["GIT_INDEX_FILE"] + ".head"
+
+
+def _read_recorded_head(runner):
+    try:
+        with open(_head_file(runner), "r") as head_file:
+            return head_file.read().strip()
+    except OSError:
+        return None
+
+
+def mark_snapshot_head(runner, head):
+    """Remember that the private index matches commit head"""
+    path = _head_file(runner)
+    with open(path + ".tmp", "w") as head_file:
+        head_file.write(f"{head or ''}\n")
+    os.replace(path + ".tmp", path)
+
+
+def sync_snapshot_index(runner):
+    """Bring the private index back to HEAD if HEAD moved since the last snapshot commit"""
+    _ref, head = head_state(runner)
+    index_path = runner.env["GIT_INDEX_FILE"]
+    exists = os.path.exists(index_path)
+    if exists and _read_recorded_head(runner) == (head or ""):
+        return
+
+    if not exists:
+        # Start from the developer's index so its stat data spares us rehashing the whole tree
+        user_index = os.path.join(os.path.dirname(index_path), "index")
+        if os.path.exists(user_index):
+            shutil.copyfile(user_index, index_path)
+            exists = True
+    if head:
+        # --reset keeps stat data for entries that already match HEAD and, unlike -m,
+        # does not refuse entries that differ from both HEAD and the working tree
+        result = runner.run("read-tree", *(["--reset"] if exists else []), head)
+    else:
+        result = runner.run("read-tree", "--empty")
+    if result.startswith("Error"):
+        raise RuntimeError(result)
+    mark_snapshot_head(runner, head)
+
+
+def sync_user_index(runner, head, paths):
+    """Point the developer's index entries for paths at commit head, leaving everything else alone"""
+    if not paths:
+        return
+    wanted = set(paths)
+    entries = {}
+    # ls-tree output is already `update-index --index-info` input; one pass over the tree and a
+    # set lookup per entry stay linear, unlike a pathspec per committed path
+    listing = runner.run_process("ls-tree", "-r", "-z", "--full-tree", head)
+    if listing.returncode != 0:
+        print(f"⚠️  Could not update the index for committed paths: {listing.stderr.strip()}")
+        return
+    for record in listing.stdout.split("\0"):
+        _info, _, path = record.partition("\t")
+        if path in wanted:
+            entries[path] = record
+    null_oid = "0" * len(head)
+    # Paths the commit deleted (or renamed away) leave the index too
+    lines = [entries.get(path, f"0 {null_oid}\t{path}") for path in wanted]
+    user_runner = GitRunner(runner.repo_path, runner.executor)
+    result = user_runner.run(
+        "update-index", "-z", "--index-info", input="".join(f"{line}\0" for line in lines)
+    )
+    if result.startswith("Error"):
+        print(f"⚠️  Could not update the index for committed paths: {result}")
+
+
+def finish_snapshot_commit(runner, head, paths):
+    """Record the new HEAD for the private index and reconcile the developer's index"""
+    mark_snapshot_head(runner, head)
+    sync_user_index(runner, head, paths)
+
+
+def commit_snapshot_index(runner, message, paths):
+    """Commit the private index on top of HEAD; returns the new commit id, or None if the branch moved"""
+    ref, head = head_state(runner)
+    tree = runner.run("write-tree")
+    if tree.startswith("Error"):
+        raise RuntimeError(tree)
+    commit = commit_tree(runner, tree, head, message)
+    if not advance_ref(runner, ref, commit, head, f"auto-commit: {message}"):
+        return None
+    finish_snapshot_commit(runner, commit, paths)
+    return commit
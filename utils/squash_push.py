@@ -0,0 +1,89 @@
+"""
+Squash-on-push: publish one commit per push window instead of every micro-commit
+Auto-commits keep landing on the local branch as usual. When a push is due, a
+single commit with the branch's current tree is created on top of the upstream
+branch and pushed instead; the micro-commits it covers stay reachable through a
+private ref (refs/auto-commit/<branch>, with a reflog), and the local branch is
+moved onto the squashed commit, which has the same tree, so the working tree and
+index are untouched
+"""
+
+from utils.commit_sequence import next_commit_number
+from utils.temp_index import advance_ref
+
+SQUASH_REF_PREFIX = "refs/auto-commit/"
+
+
+def upstream_of(runner, ref):
+    """Return (remote, remote ref, tracking ref) of a local branch, or None without an upstream"""
+    output = runner.run(
+        "for-each-ref", "--format=%(upstream:remotename)%00%(upstream:remoteref)%00%(upstream)", ref
+    )
+    if output.startswith("Error"):
+        return None
+    remote, _, rest = output.partition("\0")
+    remote_ref, _, tracking_ref = rest.partition("\0")
+    if not remote or not remote_ref or not tracking_ref:
+        return None
+    return remote, remote_ref, tracking_ref
+
+
+def squash_ref(ref):
+    """Private ref holding the micro-commits behind the last squashed push of branch ref"""
+    return SQUASH_REF_PREFIX + ref[len("refs/heads/"):]
+
+
+def resolve(runner, rev):
+    """Commit id of rev, or None"""
+    result = runner.run("rev-parse", "-q", "--verify", f"{rev}^{{commit}}")
+    return None if result.startswith("Error") or not result else result
+
+
+def is_ancestor(runner, ancestor, commit):
+    return runner.run_process("merge-base", "--is-ancestor", ancestor, commit).returncode == 0
+
+
+def squash_base(runner, head, base, covered):
+    """True if head's tree can replace base on the remote without dropping anyone else's commits"""
+    # Normally base is in head's history; when moving the branch onto the last squash lost
+    # a race, base is our own squash of `covered` (same tree) and head grew from covered instead
+    if is_ancestor(runner, base, head):
+        return True
+    if covered and is_ancestor(runner, covered, head):
+        return runner.run("rev-parse", f"{covered}^{{tree}}") == runner.run("rev-parse", f"{base}^{{tree}}")
+    return False
+
+
+def _count(runner, revision_range):
+    count = runner.run("rev-list", "--count", revision_range)
+    return int(count) if count.isdigit() else 0
+
+
+def squash_number(runner, head, base, covered):
+    """Commit number of a squash on top of base, counted back from HEAD's persisted sequence number"""
+    # Only the unpublished micro-commits are walked, never base's whole history
+    head_number = next_commit_number(runner) - 1
+    if is_ancestor(runner, base, head):
+        return head_number - _count(runner, f"{base}..{head}") + 1
+    # base is our own squash of covered's micro-commits, one commit on top of its parent
+    covered_number = head_number - _count(runner, f"{covered}..{head}")
+    return covered_number - _count(runner, f"{base}^..{covered}") + 2
+
+
+def micro_subjects(runner, head, base, covered):
+    """Subjects of the micro-commits not yet published, oldest first"""
+    args = ["log", "--reverse", "--format=%s", head, "--not", base]
+    if covered:
+        args.append(covered)
+    output = runner.run(*args)
+    if output.startswith("Error"):
+        return []
+    return [line for line in output.splitlines() if line]
+
+
+def record_squash(runner, ref, head, squashed, message):
+    """Keep the micro history on the private ref and move the branch onto squashed; True if it moved"""
+    # If new micro-commits landed meanwhile the branch stays put and the next squash builds on this one
+    runner.run("update-ref", "--create-reflog", "-m", f"auto-commit: squashed into {squashed[:7]}",
+               squash_ref(ref), head)
+    return advance_ref(runner, ref, squashed, head, f"auto-commit: squash {message}")
@@ -0,0 +1,110 @@
+"""
+Size and pattern guardrails for what the watcher stages
+Paths over the size limit or matching an excluded pattern are left unstaged (or,
+when git-lfs is installed and requested, tracked through LFS so only a pointer
+is committed), so peak memory, repository growth and push payloads stay bounded
+whatever lands in the working tree
+"""
+
+import fnmatch
+import os
+import threading
+
+DEFAULT_MAX_FILE_BYTES = 10 * 1024 * 1024
+
+
+def format_size(size):
+    """Human-readable byte count"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class StagingGuard:
+    """Decide which changed paths may be staged"""
+
+    def __init__(self, max_file_bytes=DEFAULT_MAX_FILE_BYTES, exclude_patterns=None, oversize_action="skip"):
+        self.max_file_bytes = max_file_bytes  # 0 disables the size limit
+        self.exclude_patterns = list(exclude_patterns or [])
+        self.oversize_action = oversize_action  # "skip" or "lfs"
+        self.lfs_available = None  # Probed on first use
+        self.reported = set()  # (repo, path, size, mtime) already reported, so idle checks stay quiet
+        self.lock = threading.Lock()
+
+    def excluded(self, path):
+        """Return the first exclude pattern matching path (or its file name), or None"""
+        name = os.path.basename(path.rstrip("/"))
+        for pattern in self.exclude_patterns:
+            if fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(name, pattern):
+                return pattern
+        return None
+
+    def _expand(self, runner, paths):
+        """Replace untracked directory entries ("dir/") with the untracked files inside them"""
+        directories = [path for path in paths if path.endswith("/")]
+        if not directories:
+            return paths
+        files = [path for path in paths if not path.endswith("/")]
+        output = runner.run("ls-files", "-z", "--others", "--exclude-standard", "--", *directories)
+        if output.startswith("Error"):
+            return paths
+        return files + [path for path in output.split("\0") if path]
+
+    def _use_lfs(self, runner):
+        with self.lock:
+            if self.lfs_available is None:
+                self.lfs_available = runner.run_process("lfs", "version").returncode == 0
+                if not self.lfs_available:
+                    print("⚠️  git-lfs is not installed; oversized files will be skipped instead")
+            return self.lfs_available
+
+    def filter(self, runner, paths):
+        """Split paths into (to_stage, skipped) where skipped is a list of (path, reason)"""
+        to_stage, skipped, lfs_paths = [], [], []
+        for path in self._expand(runner, paths):
+            pattern = self.excluded(path)
+            if pattern:
+                skipped.append((path, f"matches {pattern}"))
+                continue
+            try:
+                stat = os.lstat(os.path.join(runner.repo_path, path))
+            except OSError:
+                to_stage.append(path)  # Deleted: staging the removal is always cheap
+                continue
+            if self.max_file_bytes and stat.st_size > self.max_file_bytes:
+                if self.oversize_action == "lfs" and self._use_lfs(runner):
+                    lfs_paths.append(path)
+                    to_stage.append(path)
+                else:
+                    skipped.append((path, f"{format_size(stat.st_size)} > {format_size(self.max_file_bytes)}"))
+                continue
+            to_stage.append(path)
+
+        if lfs_paths:
+            result = runner.run("lfs", "track", "--filename", "--", *lfs_paths)
+            if result.startswith("Error"):
+                print(f"⚠️  git lfs track failed, skipping oversized files: {result}")
+                to_stage = [path for path in to_stage if path not in lfs_paths]
+                skipped.extend((path, "git lfs track failed") for path in lfs_paths)
+            else:
+                print(f"📦 Tracking {len(lfs_paths)} oversized files with git-lfs")
+                to_stage.append(".gitattributes")
+        return to_stage, skipped
+
+    def new_reports(self, runner, skipped):
+        """The subset of skipped paths not reported before in their current size/mtime"""
+        fresh = []
+        with self.lock:
+            for path, reason in skipped:
+                try:
+                    stat = os.lstat(os.path.join(runner.repo_path, path))
+                    key = (runner.repo_path, path, stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    key = (runner.repo_path, path, None, None)
+                if key not in self.reported:
+                    if len(self.reported) > 10000:
+                        self.reported.clear()
+                    self.reported.add(key)
+                    fresh.append((path, reason))
+        return fresh
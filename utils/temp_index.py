@@ -0,0 +1,88 @@
+"""
+Commits built with git plumbing against a private index
+A TempIndex is a throwaway GIT_INDEX_FILE inside the repository's git dir; trees
+are written from it with write-tree, commits created with commit-tree, and the
+branch is advanced with a compare-and-swap update-ref, so the user's own index
+is never read or written
+"""
+
+import os
+import tempfile
+
+ZERO_OID = "0" * 40
+
+
+class TempIndex:
+    """A private index file, optionally seeded from a tree-ish"""
+
+    def __init__(self, runner, base="HEAD"):
+        self.runner = runner
+        git_dir = runner.run("rev-parse", "--absolute-git-dir")
+        if git_dir.startswith("Error"):
+            raise RuntimeError(git_dir)
+        fd, self.path = tempfile.mkstemp(dir=git_dir, prefix="auto-commit-index.")
+        os.close(fd)
+        # git refuses an empty file as an index; start from nothing or from base
+        os.remove(self.path)
+        if base:
+            result = self.run("read-tree", base)
+            if result.startswith("Error"):
+                self.close()
+                raise RuntimeError(result)
+
+    def run(self, *args, input=None):
+        """Run git with this index as GIT_INDEX_FILE"""
+        return self.runner.run(*args, env={"GIT_INDEX_FILE": self.path}, input=input)
+
+    def update_index_info(self, lines):
+        """Apply `git update-index --index-info` lines ("mode sha [stage]\\tpath"; mode 0 removes)"""
+        if not lines:
+            return ""
+        return self.run("update-index", "-z", "--index-info", input="".join(f"{line}\0" for line in lines))
+
+    def write_tree(self):
+        """Write the index as a tree and return its id"""
+        tree = self.run("write-tree")
+        if tree.startswith("Error"):
+            raise RuntimeError(tree)
+        return tree
+
+    def close(self):
+        """Remove the index file (and a stale lock, if git left one)"""
+        for path in (self.path, self.path + ".lock"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def head_state(runner):
+    """Return (ref HEAD points at, or "HEAD" if detached; current commit id, or None if unborn)"""
+    ref = runner.run("symbolic-ref", "-q", "HEAD")
+    if ref.startswith("Error") or not ref:
+        ref = "HEAD"
+    head = runner.run("rev-parse", "-q", "--verify", "HEAD^{commit}")
+    return ref, None if head.startswith("Error") or not head else head
+
+
+def commit_tree(runner, tree, parent, message):
+    """Create a commit object for tree on top of parent (None for a root commit) and return its id"""
+    args = ["commit-tree", tree]
+    if parent:
+        args += ["-p", parent]
+    commit = runner.run(*args, "-m", message)
+    if commit.startswith("Error"):
+        raise RuntimeError(commit)
+    return commit
+
+
+def advance_ref(runner, ref, new, old, reason):
+    """Move ref from old to new only if it still points at old; return True on success"""
+    result = runner.run("update-ref", "-m", reason, ref, new, old or ZERO_OID)
+    return not result.startswith("Error")
@@ -0,0 +1,220 @@
+"""
+Shared scheduler for watching many repositories from one process
+One thread multiplexes inotify events and poll timers for every repository and
+hands due checks to a bounded worker pool in first-come, first-served order
+"""
+
+import os
+import selectors
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AdaptiveInterval:
+    """Poll interval that backs off exponentially while idle and snaps back on activity"""
+
+    def __init__(self, min_interval, max_interval=None, factor=2.0):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval or min_interval, min_interval)
+        self.factor = factor
+        self.current = min_interval
+
+    def record(self, changed):
+        """Update the interval after a check and return it"""
+        if changed:
+            self.current = self.min_interval
+        else:
+            self.current = min(self.current * self.factor, self.max_interval)
+        return self.current
+
+
+class RepoWatch:
+    """Scheduling state for one watched repository"""
+
+    def __init__(self, path, watcher=None, interval=None):
+        self.path = path
+        self.watcher = watcher
+        self.interval = interval  # AdaptiveInterval for polled repos
+        self.check_count = 0
+        self.next_check = 0.0  # Polling: when the next check is due
+        self.first_event = None  # Event-driven: first unhandled change
+        self.last_event = None  # Event-driven: most recent unhandled change
+        self.last_started = None  # Rate limiting: when the last check began
+        self.needs_check = True  # Always check once at startup
+        self.queued = False
+        self.in_flight = False
+
+    @property
+    def name(self):
+        return os.path.basename(self.path.rstrip(os.sep)) or self.path
+
+
+class WatchScheduler:
+    """Run per-repository checks concurrently on a bounded, fair worker pool"""
+
+    def __init__(self, check_fn, check_interval=30, settle_seconds=0, max_wait_seconds=0,
+                 workers=4, min_gap=5, max_interval=None, backoff=2.0):
+        self.check_fn = check_fn
+        self.check_interval = check_interval
+        self.max_interval = max_interval or check_interval
+        self.backoff = backoff
+        self.settle_seconds = settle_seconds
+        self.max_wait_seconds = max(max_wait_seconds, settle_seconds)
+        self.workers = max(1, workers)
+        self.min_gap = min_gap
+        self.repos = []
+        self.ready = deque()
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="watch")
+        # Worker threads write to this pipe to wake the scheduler when a check finishes
+        self.wake_read, self.wake_write = os.pipe()
+        os.set_blocking(self.wake_read, False)
+        # epoll/kqueue where available: no FD_SETSIZE limit on how many repositories fit
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.wake_read, selectors.EVENT_READ)
+        self.hubs = {}  # inotify fd -> hub shared by one or more watchers
+        self.by_watcher = {}  # watcher -> RepoWatch
+
+    def add_repo(self, repo):
+        """Register a RepoWatch with the scheduler"""
+        if repo.watcher is None and repo.interval is None:
+            repo.interval = AdaptiveInterval(self.check_interval, self.max_interval, self.backoff)
+        if repo.watcher is not None:
+            self.by_watcher[repo.watcher] = repo
+            if repo.watcher.fd not in self.hubs:
+                self.hubs[repo.watcher.fd] = repo.watcher.hub
+                self.selector.register(repo.watcher.fd, selectors.EVENT_READ)
+        self.repos.append(repo)
+
+    def request_check(self, path):
+        """Ask for another check of the repository at path as soon as its rate limit allows"""
+        if self.stop_event.is_set():
+            return
+        for repo in self.repos:
+            if repo.path == path:
+                repo.needs_check = True
+        os.write(self.wake_write, b"\0")
+
+    def _ready_at(self, repo):
+        """Return the monotonic time at which repo should next be checked, or None"""
+        if repo.needs_check:
+            due = 0.0
+        elif repo.watcher is not None:
+            due = None
+            if repo.first_event is not None:
+                due = min(repo.last_event + self.settle_seconds, repo.first_event + self.max_wait_seconds)
+            if repo.interval is not None:
+                # Some directories are unwatched: poll as well as listening for events
+                due = repo.next_check if due is None else min(due, repo.next_check)
+            if due is None:
+                return None
+        else:
+            due = repo.next_check
+
+        # Per-repository rate limit
+        if repo.last_started is not None:
+            due = max(due, repo.last_started + self.min_gap)
+        return due
+
+    def _collect_events(self, timeout):
+        """Wait for inotify events or a worker wake-up for at most timeout seconds"""
+        ready = self.selector.select(timeout)
+
+        now = time.monotonic()
+        for key, _events in ready:
+            if key.fd == self.wake_read:
+                try:
+                    while os.read(self.wake_read, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+                continue
+            # One read drains the shared queue for every repository on this hub
+            for watcher, changed in self.hubs[key.fd].read_events(timeout=0).items():
+                repo = self.by_watcher.get(watcher)
+                if repo is None or not changed:
+                    continue
+                if watcher.incomplete and repo.interval is None:
+                    print(f"\n⚠️  {repo.name} is no longer fully watched; polling it as well")
+                    repo.interval = AdaptiveInterval(self.check_interval, self.max_interval, self.backoff)
+                    repo.next_check = now + self.check_interval
+                if repo.first_event is None:
+                    repo.first_event = now
+                repo.last_event = now
+
+    def _run_check(self, repo):
+        """Worker body: run one check and reschedule the repository"""
+        changed = True
+        try:
+            changed = self.check_fn(repo)
+        except Exception as e:
+            print(f"\n❌ Error while checking {repo.path}: {e}")
+        finally:
+            with self.lock:
+                repo.in_flight = False
+                # Idle repos drift toward max_interval; any change snaps back to check_interval
+                interval = repo.interval.record(changed) if repo.interval else self.check_interval
+                repo.next_check = time.monotonic() + interval
+                self.in_flight -= 1
+            os.write(self.wake_write, b"\0")
+
+    def _dispatch(self, now):
+        """Queue due repositories and hand them to idle workers in FIFO order"""
+        for repo in self.repos:
+            if repo.queued or repo.in_flight:
+                continue
+            ready_at = self._ready_at(repo)
+            if ready_at is not None and ready_at <= now:
+                repo.queued = True
+                self.ready.append(repo)
+
+        with self.lock:
+            while self.ready and self.in_flight < self.workers:
+                repo = self.ready.popleft()
+                repo.queued = False
+                repo.in_flight = True
+                repo.needs_check = False
+                repo.first_event = repo.last_event = None
+                repo.last_started = now
+                self.in_flight += 1
+                self.executor.submit(self._run_check, repo)
+
+    def _next_timeout(self, now):
+        """Seconds until the earliest pending deadline, capped at the check interval"""
+        timeout = self.check_interval
+        for repo in self.repos:
+            if repo.queued or repo.in_flight:
+                continue
+            ready_at = self._ready_at(repo)
+            if ready_at is not None:
+                timeout = min(timeout, ready_at - now)
+        return max(timeout, 0)
+
+    def run(self):
+        """Schedule checks until stop() is called (or KeyboardInterrupt is raised)"""
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            self._dispatch(now)
+            self._collect_events(self._next_timeout(now))
+
+    def stop(self):
+        """Ask run() to return; safe to call from a signal handler (SIGTERM uses it)"""
+        self.stop_event.set()
+        os.write(self.wake_write, b"\0")
+
+    def shutdown(self):
+        """Let in-flight checks finish, then release resources"""
+        self.stop_event.set()
+        self.executor.shutdown(wait=True)
+        for repo in self.repos:
+            if repo.watcher:
+                repo.watcher.close()
+        for hub in self.hubs.values():
+            hub.close()
+        self.selector.close()
+        os.close(self.wake_read)
+        os.close(self.wake_write)
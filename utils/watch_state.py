@@ -0,0 +1,94 @@
+"""
+Crash-safe per-repository watcher state
+A small SQLite database (WAL journal) next to the repository's git data keeps what
+the watcher would otherwise lose on a restart: the check count, the fingerprint of
+the last tree it saw clean, how many commits are still unpushed and the message
+chosen for a snapshot that was staged but not yet committed. A restarted watcher
+picks these up instead of rescanning, re-asking the LLM and forgetting pushes
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+STATE_FILE = "auto-commit-state.sqlite3"
+
+
+class WatchState:
+    """Key/value and message store for one repository, safe to share between threads"""
+
+    def __init__(self, git_dir):
+        self.git_dir = git_dir
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(git_dir, STATE_FILE), timeout=5, check_same_thread=False)
+        # WAL with synchronous=NORMAL survives a process crash without an fsync per write
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages (key TEXT PRIMARY KEY, message TEXT, created REAL)"
+            )
+
+    def get(self, key, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key, value):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, json.dumps(value))
+            )
+
+    def clean_fingerprint(self, head):
+        """Directory mtimes recorded the last time the tree was seen clean at head, or None"""
+        fingerprint = self.get("clean_fingerprint")
+        if not fingerprint or fingerprint.get("head") != head:
+            return None
+        return fingerprint.get("dirs")
+
+    def save_clean_fingerprint(self, head, dir_mtimes):
+        self.set("clean_fingerprint", {"head": head, "dirs": dir_mtimes})
+
+    def forget_clean_fingerprint(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM state WHERE key = 'clean_fingerprint'")
+
+    def get_message(self, key):
+        """Message already chosen for a staged snapshot, or None"""
+        with self.lock:
+            row = self.conn.execute("SELECT message FROM messages WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put_message(self, key, message):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO messages (key, message, created) VALUES (?, ?, ?)",
+                (key, message, time.time()),
+            )
+
+    def drop_message(self, key, max_age=7 * 24 * 3600):
+        """Forget a committed snapshot's message, and any left behind by snapshots that never committed"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM messages WHERE key = ? OR created < ?", (key, time.time() - max_age)
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def open_watch_state(runner):
+    """Open (creating if needed) the state store of runner's repository, or None if it cannot be"""
+    git_dir = runner.run("rev-parse", "--absolute-git-dir")
+    if git_dir.startswith("Error"):
+        return None
+    try:
+        return WatchState(git_dir)
+    except sqlite3.Error as e:
+        print(f"⚠️  Could not open watcher state in {git_dir}: {e}")
+        return None